@@ -0,0 +1,65 @@
+"""Sequential vs pipelined merge: wall time and per-stage throughput of the pipeline.
+
+    python benchmarks/bench_pipeline.py [--count 24] [--max-side 800] [image/pdf ...]
+
+Without inputs, JPEG scans (2480x3508, A4 @300dpi) are generated in a temp folder.
+Sequential = merge_images(load_images(paths)); pipelined = src.pipeline.merge_pipelined.
+The stage table shows items/s, busy share, and time starved (waiting for input) or blocked
+(waiting for the next stage); the busiest stage is the bottleneck to give more workers.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.image_merger import load_images, merge_images  # noqa: E402
+from src.pipeline import merge_pipelined  # noqa: E402
+
+
+def make_scans(folder: Path, count: int):
+    paths = []
+    base = Image.effect_noise((2480, 3508), 50).convert("RGB")
+    for i in range(count):
+        path = folder / f"scan{i:03d}.jpg"
+        base.save(path, quality=90)
+        paths.append(str(path))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*")
+    parser.add_argument("--count", type=int, default=24)
+    parser.add_argument("--max-side", type=int, default=800)
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--resize-workers", type=int, default=2)
+    parser.add_argument("--label-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.inputs or make_scans(Path(tmp), args.count)
+
+        start = time.perf_counter()
+        merge_images(load_images(paths), max_image_size=args.max_side)
+        sequential = time.perf_counter() - start
+
+        result = merge_pipelined(
+            paths,
+            max_image_size=args.max_side,
+            decode_workers=args.decode_workers,
+            resize_workers=args.resize_workers,
+            label_workers=args.label_workers,
+        )
+
+    print(f"{len(paths)} inputs, max side {args.max_side}")
+    print(f"sequential {sequential:.2f}s, pipelined {result.wall:.2f}s ({sequential / result.wall:.2f}x)\n")
+    print(result.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Startup benchmark: time-to-first-window (GUI) and import time of the headless entry points.
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+Every measurement runs in a fresh interpreter so nothing is cached in-process. Times are
+medians over --runs, reported after subtracting a bare `python -c pass` start. The GUI is
+shown with QT_QPA_PLATFORM=offscreen, so this also works on CI/headless machines.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Printed by the child once the window is shown and the event loop has run.
+GUI_SNIPPET = """
+import time
+start = time.perf_counter()
+from PyQt5.QtCore import QTimer
+import main
+app, win = main.create_window([])
+def done():
+    print(f"FIRST_WINDOW {time.perf_counter() - start:.6f}")
+    app.quit()
+QTimer.singleShot(0, done)
+app.exec_()
+"""
+
+HEADLESS_MODULES = ("src.image_merger", "src.watcher", "src.server")
+
+
+def _env():
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def _wall(args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT, env=_env(), capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "child failed")
+    return elapsed, proc
+
+
+def _median(values):
+    return statistics.median(values) * 1000
+
+
+def import_breakdown(module: str, top: int = 8):
+    """Largest cumulative import times (ms) from `python -X importtime -c "import module"`."""
+    _, proc = _wall(["-X", "importtime", "-c", f"import {module}"])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = _median([_wall(["-c", "pass"])[0] for _ in range(args.runs)])
+    print(f"python -c pass: {baseline:.1f} ms (subtracted below)\n")
+
+    print("Headless import time (ms)")
+    for module in HEADLESS_MODULES:
+        ms = _median([_wall(["-c", f"import {module}"])[0] for _ in range(args.runs)]) - baseline
+        print(f"  {module:<20} {ms:8.1f}")
+
+    print("\nGUI time-to-first-window (ms)")
+    try:
+        in_process, wall = [], []
+        for _ in range(args.runs):
+            elapsed, proc = _wall(["-c", GUI_SNIPPET])
+            wall.append(elapsed)
+            in_process.append(float(proc.stdout.split("FIRST_WINDOW")[1]))
+        print(f"  {'process start → shown':<24} {_median(wall) - baseline:8.1f}")
+        print(f"  {'imports + window':<24} {_median(in_process):8.1f}")
+    except (RuntimeError, IndexError) as e:
+        print(f"  skipped: {e}")
+
+    for module in ("src.main_window", "src.image_merger"):
+        print(f"\nSlowest imports under `import {module}` (cumulative / self ms)")
+        try:
+            for cumulative, self_ms, name in import_breakdown(module):
+                print(f"  {cumulative:8.1f} {self_ms:8.1f}  {name}")
+        except RuntimeError as e:
+            print(f"  skipped: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
-"""Entry point for Image Merger GUI application."""
+"""Entry point for Image Merger GUI application.
+
+    python main.py                    GUI
+    python main.py watch watch.json   headless hot-folder watcher (src/watcher.py)
+    python main.py serve --port 8765  local HTTP merge service (src/server.py)
+
+Qt is imported only for the GUI, so the headless commands start without loading PyQt5.
+"""
 import os
 import sys
 
@@ -13,17 +20,46 @@ if sys.platform == "darwin":
         if os.path.isdir(platforms_path):
             os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = platforms_path
 
-from PyQt5.QtWidgets import QApplication
-from src.main_window import MainWindow
-from src.styles import APP_STYLESHEET
 
+def create_window(argv):
+    """Create the QApplication and show the main window. Returns (app, window)."""
+    from PyQt5.QtWidgets import QApplication
+    from src.main_window import MainWindow
+    from src.styles import APP_STYLESHEET
 
-def main():
-    app = QApplication(sys.argv)
+    app = QApplication(argv)
     app.setApplicationName("Image Merger")
     app.setStyleSheet(APP_STYLESHEET)
     win = MainWindow()
     win.show()
+    return app, win
+
+
+def _preload_in_background():
+    """Font discovery off the UI thread, after the window is on screen."""
+    import threading
+    from src.image_merger import preload_fonts
+
+    threading.Thread(target=preload_fonts, name="font-preload", daemon=True).start()
+
+
+def main():
+    # Frozen (PyInstaller) build: pool worker processes re-run this executable; let them run their
+    # job and exit instead of falling through to the GUI. No-op when not frozen.
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        from src.watcher import main as watch_main
+        return watch_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from src.server import main as serve_main
+        return serve_main(sys.argv[2:])
+
+    from PyQt5.QtCore import QTimer
+
+    app, win = create_window(sys.argv)
+    QTimer.singleShot(0, _preload_in_background)
     sys.exit(app.exec_())
 
 
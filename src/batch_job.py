@@ -0,0 +1,269 @@
+"""Resumable batch merges: survive a kill halfway through thousands of inputs.
+
+Each input is turned into its labeled block(s) (resize + label, as merge_images does) and the
+blocks are written as PNGs into a work directory. An append-only journal (manifest.jsonl) records
+every finished input with its size, mtime and SHA-256. A restart replays the journal, skips inputs
+that are unchanged (same size+mtime, or same hash if only touched) and redoes the rest. The final
+image is composed from the block files one at a time and renamed into place atomically.
+
+Run: python -m src.batch_job -o merged.png --work-dir job/ scans/ more.pdf
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .folder_scan import iter_supported_files
+from .image_merger import (
+    ResampleQuality,
+    _grid_layout,
+    _make_labeled_block,
+    _resize_to_max,
+    iter_images,
+    parse_frame_range,
+    save_image,
+)
+
+JOURNAL_NAME = "manifest.jsonl"
+JOURNAL_VERSION = 1
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BatchJob:
+    """
+    Merge `inputs` into `output_path`, checkpointing per input in `work_dir`.
+    Options are those of merge_images, plus frame_range (as in iter_images). Changing label_height,
+    max_image_size, resample or frame_range invalidates all blocks; spacing/cols_per_row/background_color only affect the final composition.
+    """
+
+    def __init__(
+        self,
+        inputs: List[str],
+        output_path: str,
+        work_dir: str,
+        spacing: int = 0,
+        label_height: int = 64,
+        cols_per_row: int = 3,
+        background_color: tuple = (255, 255, 255, 255),
+        max_image_size: int = 0,
+        resample: ResampleQuality = ResampleQuality.BEST,
+        frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    ):
+        self.inputs = [os.path.abspath(p) for p in inputs]
+        self.output_path = output_path
+        self.work_dir = Path(work_dir)
+        self.spacing = spacing
+        self.cols_per_row = cols_per_row
+        self.background_color = tuple(background_color)
+        self.block_options = {
+            "label_height": label_height,
+            "max_image_size": max_image_size,
+            "resample": ResampleQuality(resample).value,
+            "frame_range": list(frame_range) if frame_range else None,
+        }
+        self.records: Dict[str, dict] = {}  # input path → last journal record
+        self.final: Optional[dict] = None
+        self.skipped = 0  # inputs reused from a previous run
+        self.processed = 0  # inputs (re)built in this run
+
+    @property
+    def journal_path(self) -> Path:
+        return self.work_dir / JOURNAL_NAME
+
+    # --- journal -------------------------------------------------------------------------
+
+    def _header(self) -> dict:
+        return {"version": JOURNAL_VERSION, "block_options": self.block_options}
+
+    def _load_journal(self):
+        """Replay the journal. A different header (options/version) starts the job over."""
+        self.records, self.final = {}, None
+        if not self.journal_path.exists():
+            return False
+        with open(self.journal_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]) != self._header():
+                return False
+        except ValueError:
+            return False
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if "input" in entry:
+                self.records[entry["input"]] = entry
+                self.final = None
+            elif "final" in entry:
+                self.final = entry
+        return True
+
+    def _start_journal(self):
+        (self.work_dir / "blocks").mkdir(parents=True, exist_ok=True)
+        tmp = self.journal_path.with_name(JOURNAL_NAME + ".tmp")
+        tmp.write_text(json.dumps(self._header()) + "\n", encoding="utf-8")
+        os.replace(tmp, self.journal_path)
+
+    def _append(self, entry: dict):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # --- per-input work ------------------------------------------------------------------
+
+    def _is_valid(self, path: str, st: os.stat_result) -> bool:
+        record = self.records.get(path)
+        if record is None:
+            return False
+        if not all((self.work_dir / b["file"]).exists() for b in record["blocks"]):
+            return False
+        if record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+            return True
+        if record["size"] == st.st_size and record["sha256"] == _file_sha256(path):
+            # Only touched (copied, restored from backup): keep the blocks, remember the new mtime
+            record = dict(record, mtime_ns=st.st_mtime_ns)
+            self._append(record)
+            self.records[path] = record
+            return True
+        return False
+
+    def _build(self, path: str, st: os.stat_result):
+        key = hashlib.sha1(path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        blocks = []
+        # Pages/frames are decoded one at a time and written out before the next is read
+        frame_range = self.block_options["frame_range"]
+        for n, (label, img) in enumerate(iter_images([path], tuple(frame_range) if frame_range else None)):
+            if self.block_options["max_image_size"] > 0:
+                img = _resize_to_max(img, self.block_options["max_image_size"], self.block_options["resample"])
+            block = _make_labeled_block(label, img, label_height=self.block_options["label_height"])
+            rel = f"blocks/{key}_{n}.png"
+            save_image(block, str(self.work_dir / rel), compress_level=1)
+            blocks.append({"label": label, "file": rel, "w": block.width, "h": block.height})
+        record = {
+            "input": path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": _file_sha256(path),
+            "blocks": blocks,
+        }
+        self._append(record)
+        self.records[path] = record
+
+    # --- run -----------------------------------------------------------------------------
+
+    def run(self, progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """Process what is missing or changed, then write the output. Returns output path."""
+        if not self._load_journal():
+            self._start_journal()
+        total = len(self.inputs)
+        for i, path in enumerate(self.inputs, 1):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # missing inputs are skipped, as in iter_images
+            if self._is_valid(path, st):
+                self.skipped += 1
+            else:
+                self._build(path, st)
+                self.processed += 1
+            if progress is not None:
+                progress(i, total)
+        return self.finalize()
+
+    def _blocks_in_order(self) -> List[dict]:
+        blocks = []
+        for path in self.inputs:
+            record = self.records.get(path)
+            if record is not None and os.path.exists(path):
+                blocks.extend(record["blocks"])
+        return blocks
+
+    def _digest(self, blocks: List[dict]) -> str:
+        layout = [self.spacing, self.cols_per_row, list(self.background_color)]
+        hashes = [self.records[p]["sha256"] for p in self.inputs if p in self.records]
+        return hashlib.sha1(json.dumps([layout, blocks, hashes]).encode()).hexdigest()
+
+    def finalize(self) -> str:
+        """Compose the output from block files (one in memory at a time) and rename it into place."""
+        blocks = self._blocks_in_order()
+        if not blocks:
+            raise ValueError("No images to merge")
+        digest = self._digest(blocks)
+        if self.final == {"final": self.output_path, "digest": digest} and os.path.exists(self.output_path):
+            return self.output_path
+
+        if len(blocks) == 1:
+            with Image.open(self.work_dir / blocks[0]["file"]) as im:
+                result = im.convert("RGBA")
+        else:
+            rows = [blocks[i : i + self.cols_per_row] for i in range(0, len(blocks), self.cols_per_row)]
+            # Same layout as merge_images, computed from the recorded block sizes
+            size, positions = _grid_layout([[(b["w"], b["h"]) for b in row] for row in rows], self.spacing)
+            result = Image.new("RGBA", size, self.background_color)
+            for row, row_positions in zip(rows, positions):
+                for b, position in zip(row, row_positions):
+                    with Image.open(self.work_dir / b["file"]) as im:
+                        result.paste(im.convert("RGBA"), position)
+        Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
+        save_image(result, self.output_path)
+        self.final = {"final": self.output_path, "digest": digest}
+        self._append(self.final)
+        return self.output_path
+
+
+def expand_inputs(paths: List[str]) -> List[str]:
+    """Files as given; folders expanded recursively in natural order."""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(iter_supported_files(path))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Resumable merge of many images/PDFs.")
+    parser.add_argument("inputs", nargs="+", help="files or folders (folders are scanned recursively)")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--work-dir", required=True, help="checkpoint folder; reuse it to resume")
+    parser.add_argument("--spacing", type=int, default=0)
+    parser.add_argument("--label-height", type=int, default=64)
+    parser.add_argument("--cols-per-row", type=int, default=3)
+    parser.add_argument("--max-image-size", type=int, default=0)
+    parser.add_argument("--resample", choices=[q.value for q in ResampleQuality], default="best")
+    parser.add_argument("--frames", type=parse_frame_range, help="pages/frames of multi-page inputs, e.g. 1-3")
+    args = parser.parse_args(argv)
+
+    job = BatchJob(
+        expand_inputs(args.inputs),
+        args.output,
+        args.work_dir,
+        spacing=args.spacing,
+        label_height=args.label_height,
+        cols_per_row=args.cols_per_row,
+        max_image_size=args.max_image_size,
+        resample=args.resample,
+        frame_range=args.frames,
+    )
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    output = job.run(progress)
+    print(f"\n{job.processed} processed, {job.skipped} reused → {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-"""PyQt5 list widget that accepts drag-and-drop of image and PDF files."""
+"""PyQt5 list widget that accepts drag-and-drop of image and PDF files (and folders of them)."""
+import os
+import threading
+import time
 from pathlib import Path
 
-from PyQt5.QtCore import Qt, QSize, QPoint
+from PyQt5.QtCore import Qt, QSize, QPoint, QThread, pyqtSignal
 from PyQt5.QtGui import (
     QDragEnterEvent,
     QDragMoveEvent,
@@ -11,18 +14,82 @@ from PyQt5.QtGui import (
     QPainter,
     QColor,
 )
-from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QSizePolicy
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QMessageBox, QSizePolicy
 
-# Supported file extensions (images + PDF)
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tiff", ".tif"}
-PDF_EXTENSIONS = {".pdf"}
-SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS | PDF_EXTENSIONS
+from .folder_scan import iter_supported_files
+from .image_merger import IMAGE_EXTENSIONS, PDF_EXTENSIONS, SUPPORTED_EXTENSIONS
+
+# Folder scan: items are sent to the list in batches; ask before adding more than this many
+SCAN_BATCH_SIZE = 200
+SCAN_BATCH_INTERVAL = 0.1  # seconds
+SCAN_CONFIRM_LIMIT = 2000
 
 
 def is_supported_path(path: str) -> bool:
     return Path(path).suffix.lower() in SUPPORTED_EXTENSIONS
 
 
+class FolderScanner(QThread):
+    """
+    Expand dropped paths off the UI thread: folders recursively, files as they are, in drop order.
+    Emits found (path, is_loose_file) pairs in batches. After SCAN_CONFIRM_LIMIT files it pauses and
+    emits limit_reached; call resume(True/False).
+    """
+
+    found = pyqtSignal(list)
+    limit_reached = pyqtSignal(int)
+
+    def __init__(self, paths, parent=None, confirm_limit: int = SCAN_CONFIRM_LIMIT):
+        super().__init__(parent)
+        self._paths = list(paths)
+        self._confirm_limit = confirm_limit
+        self._resume = threading.Event()
+        self._continue = True
+        self._cancelled = False
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        self._cancelled = True
+        self.resume(False)
+
+    def resume(self, keep_going: bool):
+        self._continue = keep_going
+        self._resume.set()
+
+    def _iter_found(self):
+        for path in self._paths:
+            if os.path.isdir(path):
+                for found in iter_supported_files(path, cancelled=self.is_cancelled):
+                    yield found, False
+            elif is_supported_path(path):
+                yield path, True
+
+    def run(self):
+        batch, count = [], 0
+        last_emit = time.monotonic()
+        for entry in self._iter_found():
+            if self._cancelled:
+                return
+            if count == self._confirm_limit:
+                if batch:
+                    self.found.emit(batch)
+                    batch = []
+                self.limit_reached.emit(count)
+                self._resume.wait()
+                if not self._continue or self._cancelled:
+                    return
+            batch.append(entry)
+            count += 1
+            now = time.monotonic()
+            if len(batch) >= SCAN_BATCH_SIZE or now - last_emit >= SCAN_BATCH_INTERVAL:
+                self.found.emit(batch)
+                batch, last_emit = [], now
+        if batch and not self._cancelled:
+            self.found.emit(batch)
+
+
 class ImageListWidget(QListWidget):
     """List widget that accepts drag-and-drop of image files and shows thumbnails."""
 
@@ -42,6 +109,7 @@ class ImageListWidget(QListWidget):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setMinimumHeight(120)
         self._drop_line_y = None
+        self._scanners = []
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
@@ -75,14 +143,14 @@ class ImageListWidget(QListWidget):
         if event.mimeData().hasUrls():
             event.setDropAction(Qt.CopyAction)
             event.accept()
+            paths = []
             for url in event.mimeData().urls():
                 try:
-                    if url.isLocalFile():
-                        path = url.toLocalFile()
-                        if path and is_supported_path(path):
-                            self._add_item(path)
+                    if url.isLocalFile() and url.toLocalFile():
+                        paths.append(url.toLocalFile())
                 except Exception:
                     pass
+            self.add_paths(paths)
             return
         # 목록 내 순서 변경: Qt 기본 drop 시 항목 사라지는 버그 회피 → 수동 이동
         if event.source() is self:
@@ -186,13 +254,14 @@ class ImageListWidget(QListWidget):
             pass
         return QPixmap()
 
-    def _add_item(self, path: str):
+    def _add_item(self, path: str, thumbnail: bool = True):
         item = QListWidgetItem(self)
         item.setData(Qt.UserRole, path)
         item.setText(Path(path).name)
         try:
-            if Path(path).suffix.lower() == ".pdf":
+            if not thumbnail or Path(path).suffix.lower() == ".pdf":
                 # PDF: 목록에는 파일명만 표시 (드롭 시 썸네일 렌더링으로 앱 크래시 방지)
+                # 폴더 스캔 항목도 파일명만 (수천 개 디코딩으로 UI가 멈추지 않도록)
                 thumb = QPixmap()
             else:
                 thumb = QPixmap(path)
@@ -204,10 +273,81 @@ class ImageListWidget(QListWidget):
         self.addItem(item)
 
     def add_paths(self, paths: list):
+        """
+        Add files and folders in drop order. Folders are scanned recursively in the background, so a
+        drop that contains a folder (or arrives while a scan is running) is added through a scanner;
+        scanners run one after another, which keeps the order of drops and of paths within a drop.
+        """
+        if self._scanners or any(os.path.isdir(p) for p in paths):
+            self.add_folders(paths)
+            return
         for path in paths:
             if is_supported_path(path):
                 self._add_item(path)
 
+    def add_folders(self, paths: list):
+        scanner = FolderScanner(paths, self)
+        scanner.found.connect(self._on_scan_batch)
+        scanner.limit_reached.connect(lambda n, s=scanner: self._on_scan_limit(s, n))
+        scanner.finished.connect(lambda s=scanner: self._on_scan_finished(s))
+        self._scanners.append(scanner)
+        self._start_next_scan()
+
+    def _start_next_scan(self):
+        while self._scanners:
+            scanner = self._scanners[0]
+            if scanner.isRunning():
+                return
+            if scanner.is_cancelled() and not scanner.isFinished():
+                self._scanners.pop(0)  # cancelled before it started
+                scanner.deleteLater()
+                continue
+            if not scanner.isFinished():
+                scanner.start()
+            return
+
+    def is_scanning(self) -> bool:
+        return bool(self._scanners)
+
+    def cancel_scans(self, wait: bool = False):
+        """Stop all scans; with wait=True block until their threads have exited (e.g. on close)."""
+        for scanner in self._scanners:
+            scanner.cancel()
+        if wait:
+            for scanner in list(self._scanners):
+                scanner.wait()
+
+    def _on_scan_batch(self, entries: list):
+        scanner = self.sender()
+        if scanner is None or scanner.is_cancelled():
+            return
+        self.setUpdatesEnabled(False)
+        try:
+            for path, is_loose_file in entries:
+                self._add_item(path, thumbnail=is_loose_file)
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def _on_scan_limit(self, scanner: FolderScanner, count: int):
+        answer = QMessageBox.question(
+            self,
+            "폴더 추가",
+            f"폴더에서 파일을 {count}개 이상 찾았습니다. 계속 추가할까요?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        scanner.resume(answer == QMessageBox.Yes)
+
+    def _on_scan_finished(self, scanner: FolderScanner):
+        if scanner in self._scanners:
+            self._scanners.remove(scanner)
+        scanner.deleteLater()
+        self._start_next_scan()
+
+    def clear(self):
+        self.cancel_scans()
+        super().clear()
+
     def get_paths(self) -> list:
         paths = []
         for i in range(self.count()):
@@ -1,16 +1,22 @@
-"""Image merge logic - combines multiple images into one. Supports images and PDF (pages as images)."""
+"""Image merge logic - combines multiple images into one. Supports images and PDF (pages as images).
+
+Kept free of Qt, and heavy modules (PyMuPDF, ImageDraw/ImageFont, tempfile) are imported on
+first use, so the GUI and the headless entry points start fast.
+"""
 import os
 import sys
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from enum import Enum
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
+# Supported file extensions (images + PDF)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tiff", ".tif"}
+PDF_EXTENSIONS = {".pdf"}
+SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS | PDF_EXTENSIONS
 
 
 class MergeDirection(str, Enum):
@@ -19,72 +25,264 @@ class MergeDirection(str, Enum):
     HORIZONTAL = "horizontal"
 
 
-def _load_pdf_pages(path: str, dpi: int = 150) -> List[Image.Image]:
-    """Render each PDF page to a PIL Image. Returns empty list if PDF cannot be opened."""
+class ResampleQuality(str, Enum):
+    """Speed/quality of downscaling to max_image_size (see benchmarks/bench_resample.py)."""
+    FAST = "fast"  # integer reduce() (box average), then bilinear to the exact size
+    BALANCED = "balanced"  # reduce() to ≥1.25x the target, then LANCZOS (two-stage, like reducing_gap)
+    BEST = "best"  # single-pass LANCZOS from full size
+
+
+BALANCED_REDUCING_GAP = 1.25
+
+
+@lru_cache(maxsize=None)
+def _fitz():
+    """PyMuPDF module, imported on first PDF (≈0.5s import). None if not installed."""
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+    return fitz
+
+
+def _selected_frames(count: int, frame_range: Optional[Tuple[int, Optional[int]]]) -> range:
+    """
+    0-based frame indices for a 1-based inclusive (first, last) range; last None/0 = to the end.
+    The range only applies to multi-page inputs: a single-page PDF or single-frame image is always kept.
+    """
+    if frame_range is None or count <= 1:
+        return range(count)
+    first, last = frame_range
+    first = max(1, first or 1)
+    last = count if not last else min(last, count)
+    return range(first - 1, last)
+
+
+def parse_frame_range(text: str) -> Optional[Tuple[int, Optional[int]]]:
+    """Parse "3", "2-5" or "4-" (to the end) into a frame_range. Empty → None (all frames)."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    first, sep, last = text.partition("-")
+    try:
+        first_n = int(first) if first.strip() else 1
+        last_n = (int(last) if last.strip() else None) if sep else first_n
+    except ValueError:
+        raise ValueError(f"Invalid page range: {text!r} (use e.g. 3, 2-5 or 4-)")
+    if first_n < 1 or (last_n is not None and last_n < first_n):
+        raise ValueError(f"Invalid page range: {text!r} (use e.g. 3, 2-5 or 4-)")
+    return first_n, last_n
+
+
+PDF_DPI = 150  # PDF pages are rendered at this resolution
+
+
+def _iter_pdf_pages(
+    path: str, dpi: int = PDF_DPI, frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Tuple[int, int, Image.Image]]:
+    """Render PDF pages one at a time: yields (page number, page count, image). Nothing if PDF cannot be opened."""
+    fitz = _fitz()
     if fitz is None:
-        return []
-    images = []
+        return
     try:
         doc = fitz.open(path)
-        try:
-            for i in range(len(doc)):
-                page = doc[i]
-                mat = fitz.Matrix(dpi / 72, dpi / 72)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
+    except Exception:
+        return
+    try:
+        count = len(doc)
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        for i in _selected_frames(count, frame_range):
+            try:
+                pix = doc[i].get_pixmap(matrix=mat, alpha=False)
                 data = bytes(pix.samples)
                 pil_img = Image.frombytes("RGB", (pix.width, pix.height), data)
-                images.append(pil_img.convert("RGBA"))
-        finally:
-            doc.close()
+            except Exception:
+                return
+            yield i + 1, count, pil_img.convert("RGBA")
+    finally:
+        doc.close()
+
+
+def _iter_raster_frames(
+    path: Path, frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Tuple[int, int, Image.Image]]:
+    """Decode frames of a GIF/TIFF/... one at a time via seek(): yields (frame number, frame count, image)."""
+    try:
+        im = Image.open(path)
     except Exception:
-        pass
-    return images
+        return
+    with im:
+        count = getattr(im, "n_frames", 1)
+        frames = _selected_frames(count, frame_range)
+        for i in frames:
+            try:
+                im.seek(i)
+                frame = im.convert("RGBA")
+            except Exception:
+                return
+            yield i + 1, count, frame
 
 
-def _resize_to_max(img: Image.Image, max_side: int) -> Image.Image:
-    """Resize image so the longer side is at most max_side; keep aspect ratio. Returns copy."""
-    w, h = img.size
+def _iter_pdf_page_sizes(
+    path: str, dpi: int = PDF_DPI, frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Tuple[int, int, Tuple[int, int]]]:
+    """Like _iter_pdf_pages but yields the rendered size instead of rendering: (page number, page count, (w, h))."""
+    fitz = _fitz()
+    if fitz is None:
+        return
+    try:
+        doc = fitz.open(path)
+    except Exception:
+        return
+    try:
+        count = len(doc)
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        for i in _selected_frames(count, frame_range):
+            try:
+                rect = (doc[i].rect * mat).irect  # same rounding as get_pixmap
+            except Exception:
+                return
+            yield i + 1, count, (rect.width, rect.height)
+    finally:
+        doc.close()
+
+
+def _iter_raster_frame_sizes(
+    path: Path, frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Tuple[int, int, Tuple[int, int]]]:
+    """Like _iter_raster_frames but reads only headers: (frame number, frame count, (w, h))."""
+    try:
+        im = Image.open(path)
+    except Exception:
+        return
+    with im:
+        count = getattr(im, "n_frames", 1)
+        frames = _selected_frames(count, frame_range)
+        for i in frames:
+            if im.format != "GIF":  # GIF frames all have the canvas size; seeking would decode them
+                try:
+                    im.seek(i)
+                except Exception:
+                    return
+            yield i + 1, count, im.size
+
+
+def _frame_label(stem: str, number: int, count: int) -> str:
+    return f"{stem} ({number})" if count > 1 else stem
+
+
+@dataclass(frozen=True)
+class FrameRef:
+    """One page/frame of an input file: label and decoded size, known without decoding the pixels."""
+    label: str
+    path: str
+    index: int  # 0-based page/frame number
+    size: Tuple[int, int]
+
+    def load(self) -> Image.Image:
+        """Decode just this page/frame (RGBA)."""
+        frame_range = (self.index + 1, self.index + 1)
+        if Path(self.path).suffix.lower() == ".pdf":
+            frames = _iter_pdf_pages(self.path, frame_range=frame_range)
+        else:
+            frames = _iter_raster_frames(Path(self.path), frame_range)
+        for _, _, img in frames:
+            return img
+        raise ValueError(f"Cannot read {self.path} (page {self.index + 1})")
+
+
+def iter_frame_refs(
+    paths: Iterable[str], frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[FrameRef]:
+    """
+    Same items, labels and order as iter_images, as FrameRefs: only file headers (PDF page
+    rects) are read, so sizes of many inputs can be known up front and pixels decoded later.
+    """
+    for path in paths:
+        p = Path(path)
+        if not p.exists():
+            continue
+        if p.suffix.lower() == ".pdf":
+            sizes = _iter_pdf_page_sizes(path, frame_range=frame_range)
+        else:
+            sizes = _iter_raster_frame_sizes(p, frame_range)
+        for number, count, size in sizes:
+            yield FrameRef(_frame_label(p.stem, number, count), str(path), number - 1, size)
+
+
+def _fit_size(w: int, h: int, max_side: int) -> Tuple[int, int]:
+    """Size after _resize_to_max, computed without touching pixels."""
     if max_side <= 0 or (w <= max_side and h <= max_side):
-        return img.copy()
+        return w, h
     if w >= h:
-        new_w = max_side
-        new_h = max(1, int(h * max_side / w))
-    else:
-        new_h = max_side
-        new_w = max(1, int(w * max_side / h))
-    return img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        return max_side, max(1, int(h * max_side / w))
+    return max(1, int(w * max_side / h)), max_side
 
 
-def load_images(paths: List[str]) -> List[Tuple[str, Image.Image]]:
+def _resize_to_max(
+    img: Image.Image, max_side: int, quality: ResampleQuality = ResampleQuality.BEST
+) -> Image.Image:
+    """Resize image so the longer side is at most max_side; keep aspect ratio. Returns copy."""
+    new_size = _fit_size(img.width, img.height, max_side)
+    if new_size == img.size:
+        return img.copy()
+    quality = ResampleQuality(quality)
+    if quality == ResampleQuality.BEST:
+        return img.resize(new_size, Image.Resampling.LANCZOS)
+    # Integer box reduce() first. Done by hand because Pillow ignores reducing_gap for RGBA.
+    ratio = min(img.width / new_size[0], img.height / new_size[1])
+    if quality == ResampleQuality.FAST:
+        factor = int(ratio)
+        if factor >= 2:
+            img = img.reduce(factor)
+        return img.resize(new_size, Image.Resampling.BILINEAR)
+    factor = int(ratio / BALANCED_REDUCING_GAP)
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def iter_images(
+    paths: Iterable[str], frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> Iterator[Tuple[str, Image.Image]]:
     """
-    Load (label, image) from file paths.
-    Label = filename without extension. PDF pages: "stem (1)", "stem (2)", ...
+    Lazily yield (label, image) from file paths, decoding one page/frame at a time.
+    Label = filename without extension. Multi-page inputs (PDF, multi-page TIFF, animated GIF, ...)
+    are expanded: "stem (1)", "stem (2)", ... frame_range (1-based, inclusive; see parse_frame_range)
+    limits which pages/frames of multi-page inputs are decoded at all.
     """
-    labeled: List[Tuple[str, Image.Image]] = []
     for path in paths:
         p = Path(path)
         if not p.exists():
             continue
         stem = p.stem
-        suffix = p.suffix.lower()
-        if suffix == ".pdf":
-            pages = _load_pdf_pages(path)
-            for i, img in enumerate(pages, 1):
-                label = f"{stem} ({i})" if len(pages) > 1 else stem
-                labeled.append((label, img))
-            continue
-        try:
-            img = Image.open(p).convert("RGBA")
-            labeled.append((stem, img))
-        except Exception:
-            continue
-    return labeled
+        if p.suffix.lower() == ".pdf":
+            frames = _iter_pdf_pages(path, frame_range=frame_range)
+        else:
+            frames = _iter_raster_frames(p, frame_range)
+        for number, count, img in frames:
+            yield _frame_label(stem, number, count), img
+
 
+def load_images(
+    paths: List[str], frame_range: Optional[Tuple[int, Optional[int]]] = None
+) -> List[Tuple[str, Image.Image]]:
+    """
+    Load (label, image) from file paths.
+    Label = filename without extension. PDF pages / TIFF pages / GIF frames: "stem (1)", "stem (2)", ...
+    Decodes everything up front; pass iter_images() to merge_images to keep only one frame decoded.
+    """
+    return list(iter_images(paths, frame_range))
 
+
+@lru_cache(maxsize=None)
 def _default_font(size: int = 14, bold: bool = False):
     """Try to load a readable font (UTF-8/한글 가능); bold first if requested, then regular, then default.
     On Windows/CI we avoid calling getbbox() in _make_labeled_block; here we still try Arial etc. for UTF-8.
+    Looked up once per (size, bold) and cached; see preload_fonts().
     """
+    from PIL import ImageFont
+
     bold_paths = (
         "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
         "/System/Library/Fonts/Helvetica.ttc",  # index 1 is often bold
@@ -111,6 +309,11 @@ def _default_font(size: int = 14, bold: bool = False):
     return ImageFont.load_default()
 
 
+def preload_fonts():
+    """Discover the label font ahead of the first merge (e.g. on a background thread at startup)."""
+    _default_font(38, bold=True)
+
+
 def _make_labeled_block(
     label: str,
     img: Image.Image,
@@ -120,6 +323,8 @@ def _make_labeled_block(
     text_color: tuple = (0, 0, 0, 255),
 ) -> Image.Image:
     """Create one block: label at top-left (bold, larger), image below. Block width = image width."""
+    from PIL import ImageDraw
+
     font = _default_font(38, bold=True)
     max_label_w = max(img.width - padding * 2, 80)
     # On Windows or in CI, font.getbbox() can block in headless; use estimate (~10px/char, 24px height for size 38).
@@ -165,44 +370,89 @@ def _make_labeled_block(
 
 
 def merge_images(
-    labeled_items: List[Tuple[str, Image.Image]],
+    labeled_items: Iterable[Tuple[str, Image.Image]],
     direction: MergeDirection = MergeDirection.VERTICAL,
     spacing: int = 0,
     label_height: int = 64,
     cols_per_row: int = 3,
     background_color: tuple = (255, 255, 255, 255),
     max_image_size: int = 0,
+    resample: ResampleQuality = ResampleQuality.BEST,
 ) -> Image.Image:
     """
     Merge (label, image) blocks into one. Layout: up to 3 blocks per row (가로 3개), then next row.
     Each block = label at top-left, image below. Block width = image width.
-    If max_image_size > 0, each image is resized so its longer side is at most that (keeps aspect ratio).
+    If max_image_size > 0, each image is resized so its longer side is at most that (keeps aspect ratio);
+    resample picks the speed/quality tier for that (fast for previews, best for archival output).
+    labeled_items may be a lazy iterable (iter_images): each item is turned into its block as it is
+    pulled, so only one full-size decoded image is alive at a time.
     """
-    if not labeled_items:
+    blocks = []
+    for label, img in labeled_items:
+        if max_image_size > 0:
+            img = _resize_to_max(img, max_image_size, resample)
+        blocks.append(_make_labeled_block(label, img, label_height=label_height))
+    if not blocks:
         raise ValueError("No images to merge")
 
-    if max_image_size > 0:
-        labeled_items = [(label, _resize_to_max(img, max_image_size)) for label, img in labeled_items]
-
-    blocks = [_make_labeled_block(label, img, label_height=label_height) for label, img in labeled_items]
-
     if len(blocks) == 1:
         return blocks[0]
 
     # 그리드: 한 줄에 최대 cols_per_row(3)개, 다음 줄 ...
     n = len(blocks)
     rows = [blocks[i : i + cols_per_row] for i in range(0, n, cols_per_row)]
-    row_heights = [max(b.height for b in row) for row in rows]
-    row_widths = [sum(b.width for b in row) + spacing * (len(row) - 1) for row in rows]
-    total_width = max(row_widths)
-    total_height = sum(row_heights) + spacing * (len(rows) - 1)
+    return _compose_rows(rows, spacing, background_color)
 
-    result = Image.new("RGBA", (total_width, total_height), background_color)
+
+def _grid_layout(
+    rows: List[List[Tuple[int, int]]], spacing: int
+) -> Tuple[Tuple[int, int], List[List[Tuple[int, int]]]]:
+    """Canvas size and each block's top-left position for rows of block (w, h) sizes."""
+    row_heights = [max(h for _, h in row) for row in rows]
+    row_widths = [sum(w for w, _ in row) + spacing * (len(row) - 1) for row in rows]
+    total_height = sum(row_heights) + spacing * (len(rows) - 1)
+    positions = []
     y = 0
     for row, row_h in zip(rows, row_heights):
-        x = 0
-        for block in row:
-            result.paste(block, (x, y))
-            x += block.width + spacing
+        x, row_positions = 0, []
+        for w, _ in row:
+            row_positions.append((x, y))
+            x += w + spacing
+        positions.append(row_positions)
         y += row_h + spacing
+    return (max(row_widths), total_height), positions
+
+
+def _compose_rows(rows: List[List[Image.Image]], spacing: int, background_color: tuple) -> Image.Image:
+    """Paste rows of blocks top to bottom, blocks left to right, `spacing` px apart."""
+    size, positions = _grid_layout([[b.size for b in row] for row in rows], spacing)
+    result = Image.new("RGBA", size, background_color)
+    for row, row_positions in zip(rows, positions):
+        for block, position in zip(row, row_positions):
+            result.paste(block, position)
     return result
+
+
+def save_image(image: Image.Image, path: str, quality: int = 95, **params) -> str:
+    """
+    Save a merged image atomically: encode to a temp file in the same folder, then rename.
+    .jpg/.jpeg → JPEG (RGB), other suffixes → Pillow format for that suffix (PNG if unknown).
+    Extra params go to Image.save (e.g. compress_level=1). Readers of `path` never see a half-written file.
+    """
+    import tempfile
+
+    p = Path(path)
+    suffix = p.suffix.lower()
+    fd, tmp = tempfile.mkstemp(prefix=f".{p.name}.", suffix=".tmp", dir=str(p.parent))
+    os.close(fd)
+    try:
+        if suffix in (".jpg", ".jpeg"):
+            image.convert("RGB").save(tmp, "JPEG", quality=quality, **params)
+        else:
+            fmt = Image.registered_extensions().get(suffix, "PNG")
+            image.save(tmp, fmt, **params)
+        os.replace(tmp, p)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return str(p)
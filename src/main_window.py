@@ -15,11 +15,19 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QMessageBox,
     QGroupBox,
+    QLineEdit,
     QScrollArea,
 )
 
 from .image_list_widget import ImageListWidget
-from .image_merger import load_images, merge_images, MergeDirection
+from .image_merger import (
+    iter_images,
+    merge_images,
+    parse_frame_range,
+    save_image,
+    MergeDirection,
+    ResampleQuality,
+)
 
 
 class MainWindow(QMainWindow):
@@ -37,14 +45,20 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(20, 20, 20, 20)
 
         # Drop zone / list
-        group = QGroupBox("이미지 / PDF 목록 (드래그 앤 드롭 또는 추가)")
+        group = QGroupBox("이미지 / PDF 목록 (파일·폴더 드래그 앤 드롭 또는 추가)")
         group_layout = QVBoxLayout(group)
         self.image_list = ImageListWidget(self)
         group_layout.addWidget(self.image_list)
         add_btn = QPushButton("파일 추가...")
         add_btn.setObjectName("secondary")
         add_btn.clicked.connect(self._on_add_files)
-        group_layout.addWidget(add_btn)
+        add_folder_btn = QPushButton("폴더 추가...")
+        add_folder_btn.setObjectName("secondary")
+        add_folder_btn.clicked.connect(self._on_add_folder)
+        add_row = QHBoxLayout()
+        add_row.addWidget(add_btn)
+        add_row.addWidget(add_folder_btn)
+        group_layout.addLayout(add_row)
         layout.addWidget(group)
 
         # Options
@@ -66,6 +80,22 @@ class MainWindow(QMainWindow):
         self.max_size_spin.setSpecialValueText("리사이즈 안 함")
         self.max_size_spin.setToolTip("각 이미지의 긴 변을 이 값 이하로 줄입니다. 0이면 리사이즈 안 함.")
         opt_layout.addWidget(self.max_size_spin)
+        opt_layout.addWidget(QLabel("리사이즈 품질:"))
+        self.resample_combo = QComboBox()
+        self.resample_combo.addItem("빠르게 (미리보기)", ResampleQuality.FAST)
+        self.resample_combo.addItem("보통", ResampleQuality.BALANCED)
+        self.resample_combo.addItem("최고 품질 (보관용)", ResampleQuality.BEST)
+        self.resample_combo.setCurrentIndex(2)
+        self.resample_combo.setToolTip("이미지를 줄일 때의 속도/화질. '최고 품질'이 가장 느립니다.")
+        opt_layout.addWidget(self.resample_combo)
+        opt_layout.addWidget(QLabel("페이지:"))
+        self.frames_edit = QLineEdit()
+        self.frames_edit.setPlaceholderText("전체")
+        self.frames_edit.setMaximumWidth(70)
+        self.frames_edit.setToolTip(
+            "PDF·여러 페이지 TIFF·움직이는 GIF에서 쓸 페이지 (예: 3, 2-5, 4-). 비우면 전체."
+        )
+        opt_layout.addWidget(self.frames_edit)
         opt_layout.addStretch()
         layout.addLayout(opt_layout)
 
@@ -90,6 +120,11 @@ class MainWindow(QMainWindow):
 
         self._merged_image = None
 
+    def closeEvent(self, event):
+        # A QThread destroyed while running aborts the process; stop folder scans first
+        self.image_list.cancel_scans(wait=True)
+        super().closeEvent(event)
+
     def _on_add_files(self):
         paths, _ = QFileDialog.getOpenFileNames(
             self,
@@ -100,18 +135,54 @@ class MainWindow(QMainWindow):
         if paths:
             self.image_list.add_paths(paths)
 
+    def _on_add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "폴더 선택 (하위 폴더 포함)")
+        if folder:
+            self.image_list.add_paths([folder])
+
     def _on_clear(self):
         self.image_list.clear()
         self._merged_image = None
         self.save_btn.setEnabled(False)
 
     def _on_merge(self):
+        if self.image_list.is_scanning():
+            QMessageBox.information(self, "알림", "폴더를 읽는 중입니다. 목록이 다 채워진 뒤 합쳐 주세요.")
+            return
         paths = self.image_list.get_paths()
         if not paths:
             QMessageBox.information(self, "알림", "합칠 이미지를 먼저 넣어 주세요.")
             return
-        labeled_items = load_images(paths)
-        if not labeled_items:
+        try:
+            frame_range = parse_frame_range(self.frames_edit.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "오류", str(e))
+            return
+        direction = self.direction_combo.currentData()
+        spacing = self.spacing_spin.value()
+        max_image_size = self.max_size_spin.value()
+        resample = self.resample_combo.currentData()
+        count = 0
+
+        def counted(items):
+            # 페이지/프레임을 하나씩 읽어 바로 블록으로 만듦 (전체를 한꺼번에 메모리에 올리지 않음)
+            nonlocal count
+            for item in items:
+                count += 1
+                yield item
+
+        try:
+            self._merged_image = merge_images(
+                counted(iter_images(paths, frame_range)),
+                direction=direction,
+                spacing=spacing,
+                max_image_size=max_image_size,
+                resample=resample,
+            )
+        except Exception as e:
+            if count:
+                QMessageBox.critical(self, "오류", str(e))
+                return
             has_pdf = any(Path(p).suffix.lower() == ".pdf" for p in paths)
             msg = (
                 "PDF를 불러오려면 PyMuPDF가 필요합니다.\n"
@@ -121,19 +192,8 @@ class MainWindow(QMainWindow):
             )
             QMessageBox.warning(self, "오류", msg)
             return
-        direction = self.direction_combo.currentData()
-        spacing = self.spacing_spin.value()
-        max_image_size = self.max_size_spin.value()
-        try:
-            self._merged_image = merge_images(
-                labeled_items, direction=direction, spacing=spacing, max_image_size=max_image_size
-            )
-            self.save_btn.setEnabled(True)
-            QMessageBox.information(
-                self, "완료", f"블록 {len(labeled_items)}개를 합쳤습니다. '저장'으로 저장하세요."
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "오류", str(e))
+        self.save_btn.setEnabled(True)
+        QMessageBox.information(self, "완료", f"블록 {count}개를 합쳤습니다. '저장'으로 저장하세요.")
 
     def _on_save(self):
         if self._merged_image is None:
@@ -147,12 +207,9 @@ class MainWindow(QMainWindow):
         )
         if path:
             try:
-                if path.lower().endswith((".jpg", ".jpeg")):
-                    self._merged_image.convert("RGB").save(path, "JPEG", quality=95)
-                else:
-                    if not path.lower().endswith(".png"):
-                        path += ".png"
-                    self._merged_image.save(path)
+                if not path.lower().endswith((".jpg", ".jpeg", ".png")):
+                    path += ".png"
+                save_image(self._merged_image, path)
                 QMessageBox.information(self, "저장 완료", f"저장했습니다:\n{path}")
             except Exception as e:
                 QMessageBox.critical(self, "저장 오류", str(e))
@@ -0,0 +1,479 @@
+"""Local HTTP merge service: other tools POST images (or local paths) and get the merged image back.
+
+POST /merge
+    multipart/form-data: one or more file parts (any field name) in merge order, plus optional
+    form fields for the options below and repeated "path" fields for local files.
+    application/json: {"paths": [...], "spacing": 0, "max_image_size": 1200, "resample": "fast", "format": "png"}
+    "frames": "2-5" picks pages/frames of PDF, multi-page TIFF and animated GIF inputs.
+    → 200 image/png (or image/jpeg), 400 bad request, 408 client stalled, 413 upload too large,
+    429 overloaded.
+GET /metrics
+    Prometheus text format: queue depth, jobs in flight, request counts, latencies.
+
+Jobs run on a bounded process pool. A request claims its slot before its body is read, so when
+workers and queue are full it gets 429 without the upload being read at all. Multipart uploads are
+parsed incrementally and each file part is streamed straight to disk, so memory per request stays
+around CHUNK_SIZE whatever the upload size; a client stalling mid-body for `request_timeout`
+seconds gets 408 and gives its slot back. The worker encodes straight to a temp file and the
+handler streams that file back in chunks, so the result is never held in memory twice.
+
+Run: python -m src.server --port 8765
+"""
+import argparse
+import itertools
+import json
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from email import policy
+from email.parser import BytesHeaderParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .image_merger import MergeDirection, ResampleQuality, iter_images, merge_images, parse_frame_range, save_image
+
+# Options accepted from requests, with their types (everything else is ignored)
+INT_OPTIONS = ("spacing", "label_height", "cols_per_row", "max_image_size")
+OUTPUT_FORMATS = {"png": ("png", "image/png"), "jpg": ("jpg", "image/jpeg"), "jpeg": ("jpg", "image/jpeg")}
+CHUNK_SIZE = 64 * 1024
+MAX_JSON_BYTES = 16 * 1024 * 1024  # JSON bodies are read whole; uploads go multipart (streamed to disk)
+MAX_FIELD_BYTES = 1024 * 1024
+MAX_PART_HEADER_BYTES = 16 * 1024
+
+
+class BadRequest(ValueError):
+    """Request is malformed or has no usable images (→ 400)."""
+
+
+def render_job(paths: List[str], output_path: str, options: dict) -> float:
+    """Worker job: load, merge and encode to output_path. Returns seconds spent working."""
+    start = time.perf_counter()
+    options = dict(options)
+    frame_range = options.pop("frame_range", None)
+    try:
+        image = merge_images(iter_images(paths, frame_range), **options)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    save_image(image, output_path)
+    return time.perf_counter() - start
+
+
+def parse_options(fields: dict) -> Tuple[dict, str]:
+    """Turn request fields into merge_images kwargs + output format key. Raises BadRequest."""
+    options = {}
+    for key in INT_OPTIONS:
+        if key in fields and fields[key] not in ("", None):
+            try:
+                options[key] = int(fields[key])
+            except (TypeError, ValueError):
+                raise BadRequest(f"{key} must be an integer")
+            if options[key] < 0 or (key == "cols_per_row" and options[key] == 0):
+                raise BadRequest(f"{key} is out of range")
+    if fields.get("direction"):
+        try:
+            options["direction"] = MergeDirection(fields["direction"])
+        except ValueError:
+            raise BadRequest("direction must be 'vertical' or 'horizontal'")
+    if fields.get("resample"):
+        try:
+            options["resample"] = ResampleQuality(fields["resample"])
+        except ValueError:
+            raise BadRequest("resample must be fast, balanced or best")
+    if fields.get("frames"):
+        try:
+            options["frame_range"] = parse_frame_range(str(fields["frames"]))
+        except ValueError as e:
+            raise BadRequest(str(e))
+    fmt = str(fields.get("format") or "png").lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise BadRequest("format must be png or jpg")
+    return options, fmt
+
+
+class _LatencyWindow:
+    """Count/sum of all samples plus quantiles over the most recent ones."""
+
+    def __init__(self, size: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self._recent.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MergeService:
+    """Admission control, worker pool and metrics for merge jobs (independent of HTTP)."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 8, executor: Optional[Executor] = None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        self._pending = 0  # admitted, not finished (receiving upload + queued + running)
+        self.responses = {}  # status code → count
+        self.rejected = 0
+        self.latency = _LatencyWindow()  # request received → result ready
+        self.work_time = _LatencyWindow()  # time inside the worker
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    def try_reserve(self) -> bool:
+        """Claim a job slot before the request body is read; False when workers and queue are all full."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def release(self):
+        """Give back a slot from try_reserve() that will not be submitted (e.g. bad request)."""
+        self._job_done(None)
+
+    def submit_reserved(self, paths: List[str], output_path: str, options: dict) -> Future:
+        """Submit a job into a slot claimed with try_reserve(); the slot is freed when the job finishes."""
+        try:
+            future = self._executor.submit(render_job, paths, output_path, options)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(self._job_done)
+        return future
+
+    def try_submit(self, paths: List[str], output_path: str, options: dict) -> Optional[Future]:
+        """Submit a job, or return None when workers and queue are all full."""
+        if not self.try_reserve():
+            return None
+        return self.submit_reserved(paths, output_path, options)
+
+    def _job_done(self, future: Optional[Future]):
+        with self._lock:
+            self._pending -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self.work_time.add(future.result())
+
+    def record(self, status: int, started: Optional[float] = None):
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            if started is not None:
+                self.latency.add(time.perf_counter() - started)
+
+    def metrics_text(self) -> str:
+        with self._lock:
+            lines = [
+                "# TYPE merge_queue_depth gauge",
+                f"merge_queue_depth {self.queue_depth}",
+                "# TYPE merge_jobs_in_flight gauge",
+                f"merge_jobs_in_flight {min(self._pending, self.workers)}",
+                "# TYPE merge_workers gauge",
+                f"merge_workers {self.workers}",
+                "# TYPE merge_rejected_total counter",
+                f"merge_rejected_total {self.rejected}",
+                "# TYPE merge_responses_total counter",
+            ]
+            lines += [f'merge_responses_total{{code="{code}"}} {n}' for code, n in sorted(self.responses.items())]
+            for name, window in (("merge_latency_seconds", self.latency), ("merge_work_seconds", self.work_time)):
+                lines.append(f"# TYPE {name} summary")
+                lines += [f'{name}{{quantile="{q}"}} {window.quantile(q):.6f}' for q in (0.5, 0.9, 0.99)]
+                lines.append(f"{name}_sum {window.total:.6f}")
+                lines.append(f"{name}_count {window.count}")
+        return "\n".join(lines) + "\n"
+
+    def shutdown(self):
+        if self._owns_executor:
+            self._executor.shutdown()
+
+
+class _MultipartReader:
+    """Incremental reader for a multipart body of known length: holds about CHUNK_SIZE bytes at a time."""
+
+    def __init__(self, stream, length: int, boundary: str):
+        self._stream = stream
+        self._remaining = length
+        self._buf = b"\r\n"  # so the first delimiter looks like all the others
+        self.delimiter = b"\r\n--" + boundary.encode("latin-1")
+
+    def _fill(self) -> bool:
+        if self._remaining <= 0:
+            return False
+        chunk = self._stream.read(min(CHUNK_SIZE, self._remaining))
+        if not chunk:
+            raise BadRequest("Request body ended early")
+        self._remaining -= len(chunk)
+        self._buf += chunk
+        return True
+
+    def read_until(self, marker: bytes, write: Callable[[bytes], object]):
+        """Pass everything before `marker` to write() as it arrives, then skip the marker."""
+        while True:
+            i = self._buf.find(marker)
+            if i >= 0:
+                write(self._buf[:i])
+                self._buf = self._buf[i + len(marker):]
+                return
+            safe = len(self._buf) - (len(marker) - 1)  # a marker may start in the unread tail
+            if safe > 0:
+                write(self._buf[:safe])
+                self._buf = self._buf[safe:]
+            if not self._fill():
+                raise BadRequest("Malformed multipart body")
+
+    def read_exact(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            if not self._fill():
+                raise BadRequest("Malformed multipart body")
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def drain(self):
+        """Discard the epilogue, so the connection stays usable."""
+        self._buf = b""
+        while self._fill():
+            self._buf = b""
+
+
+def _collector(limit: int, what: str) -> Tuple[List[bytes], Callable[[bytes], None]]:
+    chunks: List[bytes] = []
+    size = [0]
+
+    def write(data: bytes):
+        size[0] += len(data)
+        if size[0] > limit:
+            raise BadRequest(f"{what} too large")
+        chunks.append(data)
+
+    return chunks, write
+
+
+def _parse_multipart(content_type: str, stream, length: int, upload_dir: Path) -> Tuple[List[str], dict]:
+    """
+    Stream file parts straight to files under upload_dir (keeping their names for labels), so an
+    upload is never held in memory. Returns (paths, fields).
+    """
+    header = BytesHeaderParser(policy=policy.HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1"))
+    boundary = header.get_boundary()
+    if not boundary:
+        raise BadRequest("Malformed multipart body")
+    reader = _MultipartReader(stream, length, boundary)
+    reader.read_until(reader.delimiter, lambda preamble: None)
+    paths, fields = [], {"path": []}
+    for i in itertools.count():
+        after = reader.read_exact(2)
+        if after == b"--":
+            break  # closing delimiter
+        if after != b"\r\n":
+            raise BadRequest("Malformed multipart body")
+        raw, write = _collector(MAX_PART_HEADER_BYTES, "Part header")
+        reader.read_until(b"\r\n\r\n", write)
+        part = BytesHeaderParser(policy=policy.HTTP).parsebytes(b"".join(raw) + b"\r\n\r\n")
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_filename()
+        if filename:
+            # One folder per upload so identical names don't collide; label stays the file stem
+            target = upload_dir / str(i) / (Path(filename).name or "upload")
+            target.parent.mkdir(parents=True)
+            with open(target, "wb") as f:
+                reader.read_until(reader.delimiter, f.write)
+            paths.append(str(target))
+            continue
+        chunks, write = _collector(MAX_FIELD_BYTES, f"Field {name!r}")
+        reader.read_until(reader.delimiter, write)
+        value = b"".join(chunks).decode("utf-8")
+        if name == "path":
+            fields["path"].append(value)
+        elif name:
+            fields[name] = value
+    reader.drain()
+    return paths + fields.pop("path"), fields
+
+
+class MergeRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ImageMerger"
+    timeout = 30  # seconds a socket read/write may stall; overridden by MergeHTTPServer.request_timeout
+
+    def setup(self):
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    @property
+    def service(self) -> MergeService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_text(self, status: int, text: str, content_type: str = "text/plain; charset=utf-8", headers=None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self._send_text(200, self.service.metrics_text(), "text/plain; version=0.0.4")
+        elif path == "/health":
+            self._send_text(200, "ok\n")
+        else:
+            self._send_text(404, "not found\n")
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/merge":
+            self._send_text(404, "not found\n")
+            return
+        started = time.perf_counter()
+        work_dir = Path(tempfile.mkdtemp(prefix="imagemerger-"))
+        try:
+            status = self._handle_merge(work_dir, started)
+        except BadRequest as e:
+            status = 400
+            self._send_text(status, f"{e}\n")
+        except ConnectionError:
+            return  # client went away mid-response
+        except socket.timeout:
+            # Client stalled mid-body; its job slot has already been released
+            status = 408
+            self.close_connection = True
+            try:
+                self._send_text(status, "request timed out\n")
+            except OSError:
+                pass
+        except Exception as e:
+            status = 500
+            self._send_text(status, f"{e}\n")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self.service.record(status, started if status == 200 else None)
+
+    def _handle_merge(self, work_dir: Path, started: float) -> int:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # body length unknown; don't try to read it
+            raise BadRequest("Invalid Content-Length")
+        content_type = self.headers.get("Content-Type", "")
+        if length > self.server.max_upload_bytes or (
+            content_type.startswith("application/json") and length > MAX_JSON_BYTES
+        ):
+            self._send_text(413, "upload too large\n")
+            self.close_connection = True
+            return 413
+        # Admission happens before the body is read, so an overloaded server spends no memory or
+        # disk on requests it is going to reject
+        if not self.service.try_reserve():
+            self._send_text(429, "server busy, retry later\n", headers={"Retry-After": "1"})
+            self.close_connection = True
+            return 429
+        try:
+            paths, options, output_path, mime = self._read_request(length, work_dir)
+        except BaseException:
+            self.service.release()
+            raise
+        future = self.service.submit_reserved(paths, str(output_path), options)
+        future.result()  # re-raises BadRequest / merge errors
+
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(output_path.stat().st_size))
+        self.send_header("X-Merge-Seconds", f"{time.perf_counter() - started:.3f}")
+        self.end_headers()
+        with open(output_path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+        return 200
+
+    def _read_request(self, length: int, work_dir: Path) -> Tuple[List[str], dict, Path, str]:
+        """Read and parse the body. Returns (paths, merge options, output path, MIME type)."""
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            paths, fields = _parse_multipart(content_type, self.rfile, length, work_dir)
+        elif content_type.startswith("application/json"):
+            try:
+                fields = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise BadRequest("Malformed JSON body")
+            if not isinstance(fields, dict) or not isinstance(fields.get("paths", []), list):
+                raise BadRequest("JSON body must be an object with a 'paths' list")
+            paths = [str(p) for p in fields.get("paths", [])]
+        else:
+            raise BadRequest("Content-Type must be multipart/form-data or application/json")
+        if not paths:
+            raise BadRequest("No images to merge")
+        options, fmt = parse_options(fields)
+        ext, mime = OUTPUT_FORMATS[fmt]
+        return paths, options, work_dir / f"merged.{ext}", mime
+
+
+class MergeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        service: MergeService,
+        max_upload_bytes: int = 512 * 1024 * 1024,
+        quiet: bool = False,
+        request_timeout: float = 30.0,
+    ):
+        super().__init__(address, MergeRequestHandler)
+        self.service = service
+        self.request_timeout = request_timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.quiet = quiet
+
+    def server_close(self):
+        super().server_close()
+        self.service.shutdown()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve image merging over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="merge processes")
+    parser.add_argument("--max-queue", type=int, default=8, help="jobs waiting beyond workers before 429")
+    parser.add_argument("--max-upload-mb", type=int, default=512)
+    parser.add_argument("--request-timeout", type=float, default=30.0, help="seconds a client may stall mid-request")
+    args = parser.parse_args(argv)
+    service = MergeService(workers=args.workers, max_queue=args.max_queue)
+    httpd = MergeHTTPServer(
+        (args.host, args.port),
+        service,
+        max_upload_bytes=args.max_upload_mb * 1024 * 1024,
+        request_timeout=args.request_timeout,
+    )
+    print(f"Serving on http://{args.host}:{httpd.server_address[1]}  (POST /merge, GET /metrics)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
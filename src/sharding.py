@@ -0,0 +1,236 @@
+"""Multi-page output: split the merge layout into pages and compose/encode them in parallel.
+
+A single merged image gets impractical past a certain size, so merge_pages() cuts the grid into
+pages by maximum pixel height/width or maximum rows per page. Pages are independent: each worker
+resizes and labels only its own items, composes the page and encodes it, and wall-clock time
+scales with cores (Pillow releases the GIL while resizing and encoding).
+
+merge_pages_from_files() plans the pages from file headers only (iter_frame_refs) and each page
+job decodes just its own pages/frames, so peak memory is about one page per job in flight
+instead of every input decoded at once.
+
+Output by suffix of output_path:
+    .png / .jpg  → numbered files: merged_001.png, merged_002.png, ... (just merged.png if one page);
+                   numbered pages left over from an earlier, longer run are removed first
+    .tif / .pdf  → one multi-page file (pages appended in order as they finish)
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .image_merger import (
+    FrameRef,
+    ResampleQuality,
+    _compose_rows,
+    _fit_size,
+    _make_labeled_block,
+    _resize_to_max,
+    iter_frame_refs,
+    save_image,
+)
+
+MULTIPAGE_FORMATS = {".tif": "TIFF", ".tiff": "TIFF", ".pdf": "PDF"}
+
+# A page item: a decoded (label, image) pair, or a FrameRef decoded by the page job that needs it
+PageItem = Union[Tuple[str, Image.Image], FrameRef]
+
+
+def _item_size(item: PageItem) -> Tuple[int, int]:
+    return item.size if isinstance(item, FrameRef) else item[1].size
+
+
+def _item_image(item: PageItem) -> Tuple[str, Image.Image]:
+    return (item.label, item.load()) if isinstance(item, FrameRef) else item
+
+
+def plan_pages(
+    block_sizes: List[Tuple[int, int]],
+    cols_per_row: int = 3,
+    spacing: int = 0,
+    max_page_height: int = 0,
+    max_page_width: int = 0,
+    max_rows_per_page: int = 0,
+) -> List[List[List[int]]]:
+    """
+    Lay blocks out like merge_images and cut the result into pages. Returns pages → rows → item indices.
+    A row ends after cols_per_row blocks, or earlier if the next block would exceed max_page_width.
+    A page ends before a row that would exceed max_page_height, or after max_rows_per_page rows.
+    A row or page always holds at least one block, so oversized blocks get a page of their own.
+    Limits of 0 mean no limit.
+    """
+    rows: List[List[int]] = []
+    row: List[int] = []
+    row_w = 0
+    for i, (w, _) in enumerate(block_sizes):
+        next_w = row_w + (spacing if row else 0) + w
+        if row and (len(row) >= cols_per_row or (max_page_width > 0 and next_w > max_page_width)):
+            rows.append(row)
+            row, next_w = [], w
+        row.append(i)
+        row_w = next_w
+    if row:
+        rows.append(row)
+
+    pages: List[List[List[int]]] = []
+    page: List[List[int]] = []
+    page_h = 0
+    for row in rows:
+        row_h = max(block_sizes[i][1] for i in row)
+        next_h = page_h + (spacing if page else 0) + row_h
+        too_tall = max_page_height > 0 and next_h > max_page_height
+        too_many = max_rows_per_page > 0 and len(page) >= max_rows_per_page
+        if page and (too_tall or too_many):
+            pages.append(page)
+            page, next_h = [], row_h
+        page.append(row)
+        page_h = next_h
+    if page:
+        pages.append(page)
+    return pages
+
+
+def _compose_page(
+    labeled_items: List[PageItem],
+    rows: List[List[int]],
+    spacing: int,
+    label_height: int,
+    background_color: tuple,
+    max_image_size: int,
+    resample: ResampleQuality,
+) -> Image.Image:
+    block_rows = []
+    for row in rows:
+        blocks = []
+        for i in row:
+            label, img = _item_image(labeled_items[i])
+            if max_image_size > 0:
+                img = _resize_to_max(img, max_image_size, resample)
+            blocks.append(_make_labeled_block(label, img, label_height=label_height))
+        block_rows.append(blocks)
+    return _compose_rows(block_rows, spacing, background_color)
+
+
+def _numbered_path(output_path: str, number: int, total: int) -> str:
+    if total == 1:
+        return output_path
+    p = Path(output_path)
+    digits = max(3, len(str(total)))
+    return str(p.with_name(f"{p.stem}_{number:0{digits}d}{p.suffix}"))
+
+
+def _remove_stale_pages(output_path: str, total: int):
+    """Delete files from an earlier run of this output that this run won't overwrite (extra pages, or the other naming)."""
+    p = Path(output_path)
+    keep = {Path(_numbered_path(output_path, n, total)).name for n in range(1, total + 1)}
+    numbered = re.compile(rf"{re.escape(p.stem)}_\d{{3,}}{re.escape(p.suffix)}")
+    try:
+        names = os.listdir(p.parent)
+    except OSError:
+        return
+    for name in names:
+        if name not in keep and (name == p.name or numbered.fullmatch(name)):
+            (p.parent / name).unlink(missing_ok=True)
+
+
+def _in_order(executor: ThreadPoolExecutor, fn, jobs: list, window: int) -> Iterator:
+    """executor.map with at most `window` jobs submitted ahead of the consumer (bounds memory)."""
+    pending = []
+    jobs = iter(jobs)
+    for job in jobs:
+        pending.append(executor.submit(fn, *job))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.pop(0).result()
+        for job in jobs:
+            pending.append(executor.submit(fn, *job))
+            break
+        yield result
+
+
+def merge_pages(
+    labeled_items: List[PageItem],
+    output_path: str,
+    spacing: int = 0,
+    label_height: int = 64,
+    cols_per_row: int = 3,
+    background_color: tuple = (255, 255, 255, 255),
+    max_image_size: int = 0,
+    resample: ResampleQuality = ResampleQuality.BEST,
+    max_page_height: int = 0,
+    max_page_width: int = 0,
+    max_rows_per_page: int = 0,
+    workers: int = 0,
+    quality: int = 95,
+    resolution: float = 150.0,
+) -> List[str]:
+    """
+    Merge (label, image) items or FrameRefs into pages (see plan_pages) and write them. Returns
+    written paths. Same block/grid options as merge_images. workers=0 → one per CPU. Each file is
+    written atomically. FrameRefs are decoded by the job composing their page.
+    """
+    if not labeled_items:
+        raise ValueError("No images to merge")
+    sizes = []
+    for item in labeled_items:
+        w, h = _fit_size(*_item_size(item), max_image_size)
+        sizes.append((w, label_height + h))
+    pages = plan_pages(sizes, cols_per_row, spacing, max_page_height, max_page_width, max_rows_per_page)
+    options = (spacing, label_height, background_color, max_image_size, resample)
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    multipage = MULTIPAGE_FORMATS.get(Path(output_path).suffix.lower())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if multipage is None:
+            def write_page(number, rows):
+                page = _compose_page(labeled_items, rows, *options)
+                return save_image(page, _numbered_path(output_path, number, len(pages)), quality=quality)
+
+            _remove_stale_pages(output_path, len(pages))
+            jobs = [(n, rows) for n, rows in enumerate(pages, 1)]
+            return list(_in_order(executor, write_page, jobs, window=workers * 2))
+
+        def compose(rows):
+            return _compose_page(labeled_items, rows, *options)
+
+        composed = _in_order(executor, compose, [(rows,) for rows in pages], window=workers + 1)
+        _save_multipage(composed, output_path, multipage, quality, resolution)
+    return [output_path]
+
+
+def merge_pages_from_files(
+    paths: Iterable[str],
+    output_path: str,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    **options,
+) -> List[str]:
+    """merge_pages for files: pages are planned from headers, and each page job decodes only its own items."""
+    return merge_pages(list(iter_frame_refs(paths, frame_range)), output_path, **options)
+
+
+def _save_multipage(pages: Iterator[Image.Image], output_path: str, fmt: str, quality: int, resolution: float):
+    """Append pages one by one to a TIFF/PDF temp file, then rename it into place."""
+    import tempfile
+
+    p = Path(output_path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{p.name}.", suffix=".tmp", dir=str(p.parent))
+    os.close(fd)
+    try:
+        if fmt == "TIFF":
+            from PIL.TiffImagePlugin import AppendingTiffWriter
+
+            with AppendingTiffWriter(tmp, new=True) as tf:
+                for page in pages:
+                    page.save(tf, "TIFF", compression="tiff_adobe_deflate", dpi=(resolution, resolution))
+                    tf.newFrame()
+        else:
+            for i, page in enumerate(pages):
+                page.convert("RGB").save(tmp, "PDF", append=i > 0, resolution=resolution, quality=quality)
+        os.replace(tmp, p)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,457 @@
+"""Headless hot-folder watcher: merges scan batches dropped into watched folders.
+
+Each subfolder of a watched folder is one batch. A batch is merged once it has settled
+(no file changes for `settle_seconds`, or its marker file exists) and the result is written
+atomically to the folder's output directory. Queued and finished batches are kept in a JSON
+state file, so a restart neither loses queued batches nor re-merges finished ones.
+
+Finished batches are not re-hashed on every poll: they are checked again when their folder's
+mtime changes (files added/removed/renamed), when watchdog reports an event under them (files
+overwritten in place), or at the periodic full rescan (`full_rescan_interval`).
+
+Run: python -m src.watcher watch.json
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .image_merger import (
+    SUPPORTED_EXTENSIONS,
+    ResampleQuality,
+    iter_images,
+    merge_images,
+    parse_frame_range,
+    save_image,
+)
+from .sharding import merge_pages_from_files
+
+try:
+    # inotify (Linux) / FSEvents (macOS) / ReadDirectoryChanges (Windows); polling otherwise
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+log = logging.getLogger(__name__)
+
+MAX_CRASH_RETRIES = 3  # a batch whose worker process died is re-queued this many times, then failed
+
+
+@dataclass
+class WatchFolder:
+    """One watched folder and the merge settings for its batches."""
+    path: str
+    output_dir: str
+    output_format: str = "png"
+    spacing: int = 0
+    label_height: int = 64
+    cols_per_row: int = 3
+    max_image_size: int = 0
+    resample: str = "best"  # fast / balanced / best (ResampleQuality)
+    frames: str = ""  # pages/frames of multi-page inputs, e.g. "1-3"; empty = all
+    # Split output into pages (numbered files, or one multi-page .tif/.pdf); 0 = single image
+    max_page_height: int = 0
+    max_page_width: int = 0
+    max_rows_per_page: int = 0
+    settle_seconds: float = 10.0
+    marker_name: Optional[str] = None  # e.g. ".done": merge only after this file appears
+
+    def __post_init__(self):
+        self.resample = ResampleQuality(self.resample).value  # reject typos when the config loads
+        parse_frame_range(self.frames)
+        root, out = Path(self.path).resolve(), Path(self.output_dir).resolve()
+        if out == root or root in out.parents:
+            # output folders there would be picked up as batches and merged again
+            raise ValueError(f"output_dir {self.output_dir} must be outside the watched folder {self.path}")
+
+    def merge_options(self) -> dict:
+        options = {
+            "spacing": self.spacing,
+            "label_height": self.label_height,
+            "cols_per_row": self.cols_per_row,
+            "max_image_size": self.max_image_size,
+            "resample": ResampleQuality(self.resample),
+            "frame_range": parse_frame_range(self.frames),
+        }
+        if self.max_page_height or self.max_page_width or self.max_rows_per_page:
+            options.update(
+                max_page_height=self.max_page_height,
+                max_page_width=self.max_page_width,
+                max_rows_per_page=self.max_rows_per_page,
+            )
+        return options
+
+    def output_path(self, batch_dir: str) -> str:
+        return str(Path(self.output_dir) / f"{Path(batch_dir).name}.{self.output_format.lstrip('.')}")
+
+
+def merge_batch(paths: List[str], output_path: str, options: dict) -> str:
+    """Worker job: load, merge and atomically save one batch. Runs in a pool process."""
+    options = dict(options)
+    frame_range = options.pop("frame_range", None)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    if "max_rows_per_page" in options:
+        # one worker process per batch already; keep page encoding in this process single-threaded
+        pages = merge_pages_from_files(paths, output_path, frame_range=frame_range, workers=1, **options)
+        return ", ".join(pages)
+    image = merge_images(iter_images(paths, frame_range), **options)
+    return save_image(image, output_path)
+
+
+def _stats(entry: os.DirEntry) -> bool:
+    """Stat the entry now (DirEntry caches it for _signature); False if it vanished since scandir."""
+    try:
+        entry.stat()
+    except OSError:
+        return False
+    return True
+
+
+def _batch_files(batch_dir: str) -> List[os.DirEntry]:
+    """Supported files directly inside the batch folder, sorted by name. Files moved away mid-scan are left out."""
+    try:
+        with os.scandir(batch_dir) as it:
+            entries = [
+                e for e in it
+                if e.is_file() and not e.name.startswith(".")
+                and os.path.splitext(e.name)[1].lower() in SUPPORTED_EXTENSIONS
+                and _stats(e)
+            ]
+    except OSError:
+        return []
+    entries.sort(key=lambda e: e.name)
+    return entries
+
+
+def _signature(entries: List[os.DirEntry]) -> str:
+    """Hash of (name, size, mtime) of every file; changes whenever the batch changes."""
+    h = hashlib.sha1()
+    for e in entries:
+        st = e.stat()  # cached by _batch_files
+        h.update(f"{e.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    return h.hexdigest()
+
+
+class WatchState:
+    """Persistent queue + finished set, saved atomically as JSON after every change."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.queue: List[str] = []  # batch dirs waiting or running, oldest first
+        self.done: Dict[str, str] = {}  # batch dir → signature that was merged
+        self.failed: Dict[str, str] = {}  # batch dir → signature that failed (retried on change)
+        self.crashes: Dict[str, int] = {}  # batch dir → times its worker process died (see MAX_CRASH_RETRIES)
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.queue = list(data.get("queue", []))
+                self.done = dict(data.get("done", {}))
+                self.failed = dict(data.get("failed", {}))
+                self.crashes = dict(data.get("crashes", {}))
+            except (OSError, ValueError):
+                log.warning("Ignoring unreadable state file %s", self.path)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        data = {"queue": self.queue, "done": self.done, "failed": self.failed, "crashes": self.crashes}
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class _WakeHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "HotFolderWatcher"):
+        self._watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path:
+                self._watcher.note_change(os.fsdecode(path))
+        self._watcher._wake.set()
+
+
+class HotFolderWatcher:
+    """
+    Scan watched folders, queue settled batches and merge them on a worker pool.
+    At most `max_in_flight` batches are submitted at once; the rest wait in the persistent queue.
+    """
+
+    def __init__(
+        self,
+        folders: List[WatchFolder],
+        state_path: str,
+        workers: int = 2,
+        poll_interval: float = 2.0,
+        max_in_flight: int = 0,
+        executor: Optional[Executor] = None,
+        full_rescan_interval: float = 600.0,
+    ):
+        self.folders: Dict[str, WatchFolder] = {str(Path(f.path).resolve()): f for f in folders}
+        self.state = WatchState(state_path)
+        self.poll_interval = poll_interval
+        self.max_in_flight = max_in_flight if max_in_flight > 0 else workers * 2
+        self._workers = workers
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self._owns_executor = executor is None
+        self._in_flight: Dict[Future, Tuple[str, str]] = {}
+        self._seen: Dict[str, Tuple[str, float]] = {}  # batch dir → (signature, time first seen)
+        self.full_rescan_interval = full_rescan_interval
+        self._last_full_scan = time.monotonic()
+        self._clean: Dict[str, int] = {}  # finished batch dir → folder mtime when its files were last hashed
+        self._dirty: Set[str] = set()  # batch dirs with filesystem events since the last scan
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def note_change(self, path: str):
+        """A file or folder changed (watchdog event): re-hash its batch on the next scan."""
+        for root in self.folders:
+            try:
+                rel = Path(path).relative_to(root)
+            except ValueError:
+                continue
+            if rel.parts:
+                with self._dirty_lock:
+                    self._dirty.add(os.path.join(root, rel.parts[0]))
+            return
+
+    def _folder_for(self, batch_dir: str) -> Optional[WatchFolder]:
+        return self.folders.get(str(Path(batch_dir).parent))
+
+    def _is_settled(self, batch_dir: str, signature: str, folder: WatchFolder, now: float) -> bool:
+        if folder.marker_name:
+            return os.path.exists(os.path.join(batch_dir, folder.marker_name))
+        seen = self._seen.get(batch_dir)
+        if seen is None or seen[0] != signature:
+            self._seen[batch_dir] = (signature, now)
+            return False
+        return now - seen[1] >= folder.settle_seconds
+
+    def scan(self) -> int:
+        """Queue every batch that has settled and changed since it was last merged. Returns count queued."""
+        now = time.monotonic()
+        if now - self._last_full_scan >= self.full_rescan_interval:
+            self._clean.clear()
+            self._last_full_scan = now
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for batch_dir in dirty:
+            self._clean.pop(batch_dir, None)
+        queued = set(self.state.queue)
+        added = 0
+        for root, folder in self.folders.items():
+            try:
+                with os.scandir(root) as it:
+                    batch_dirs = [e for e in it if e.is_dir() and not e.name.startswith(".")]
+            except OSError as e:
+                log.warning("Cannot scan %s: %s", root, e)
+                continue
+            for entry in sorted(batch_dirs, key=lambda e: e.name):
+                batch_dir = entry.path
+                if batch_dir in queued:
+                    continue
+                try:
+                    dir_mtime = entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if self._clean.get(batch_dir) == dir_mtime:
+                    continue  # finished and untouched: one stat instead of one per file
+                files = _batch_files(batch_dir)
+                if not files:
+                    continue
+                signature = _signature(files)
+                if signature in (self.state.done.get(batch_dir), self.state.failed.get(batch_dir)):
+                    self._clean[batch_dir] = dir_mtime
+                    continue
+                self._clean.pop(batch_dir, None)
+                if not self._is_settled(batch_dir, signature, folder, now):
+                    continue
+                self._seen.pop(batch_dir, None)
+                self.state.queue.append(batch_dir)
+                added += 1
+        if added:
+            self.state.save()
+        return added
+
+    def dispatch(self) -> int:
+        """Submit queued batches while there is room in the pool. Returns count submitted."""
+        running = {batch_dir for batch_dir, _ in self._in_flight.values()}
+        submitted = 0
+        for batch_dir in list(self.state.queue):
+            if len(self._in_flight) >= self.max_in_flight:
+                break
+            if batch_dir in running:
+                continue
+            folder = self._folder_for(batch_dir)
+            files = _batch_files(batch_dir)
+            if folder is None or not files:
+                self.state.queue.remove(batch_dir)
+                self.state.save()
+                continue
+            signature = _signature(files)
+            job = (merge_batch, [e.path for e in files], folder.output_path(batch_dir), folder.merge_options())
+            try:
+                future = self._submit(*job)
+            except BrokenExecutor as e:
+                self._record_crash(batch_dir, signature, e)
+                self.state.save()
+                continue
+            self._in_flight[future] = (batch_dir, signature)
+            submitted += 1
+        return submitted
+
+    def _record_crash(self, batch_dir: str, signature: str, error: BaseException):
+        """
+        The pool broke (a worker process died, e.g. OOM kill). That takes down every batch in flight,
+        not just the one that caused it, so keep the batch queued and retry; give up after a few tries.
+        """
+        crashes = self.state.crashes.get(batch_dir, 0) + 1
+        if crashes > MAX_CRASH_RETRIES:
+            self.state.crashes.pop(batch_dir, None)
+            self.state.failed[batch_dir] = signature
+            if batch_dir in self.state.queue:
+                self.state.queue.remove(batch_dir)
+            log.error("Failed to merge %s: worker died %d times (%s)", batch_dir, crashes, error)
+            return
+        self.state.crashes[batch_dir] = crashes
+        if batch_dir not in self.state.queue:
+            self.state.queue.append(batch_dir)
+        log.warning("Worker died while merging %s (%s); retrying (%d/%d)", batch_dir, error, crashes, MAX_CRASH_RETRIES)
+
+    def _submit(self, fn, *args) -> Future:
+        """Submit to the pool; a pool broken by a crashed worker (e.g. OOM kill) is replaced once."""
+        try:
+            return self._executor.submit(fn, *args)
+        except BrokenExecutor:
+            if not self._owns_executor:
+                raise
+            log.warning("Worker pool broke (a worker process died); starting a new one")
+            self._executor.shutdown(wait=False)
+            self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            return self._executor.submit(fn, *args)
+
+    def collect(self, timeout: Optional[float] = 0) -> int:
+        """Record finished jobs (waiting up to `timeout` for one). Returns count finished."""
+        if not self._in_flight:
+            return 0
+        finished = [f for f in self._in_flight if f.done()]
+        if not finished and timeout != 0:
+            end = None if timeout is None else time.monotonic() + timeout
+            while not finished:
+                if end is not None and time.monotonic() >= end:
+                    break
+                time.sleep(0.05)
+                finished = [f for f in self._in_flight if f.done()]
+        for future in finished:
+            batch_dir, signature = self._in_flight.pop(future)
+            try:
+                output = future.result()
+            except BrokenExecutor as e:
+                self._record_crash(batch_dir, signature, e)
+                continue
+            except Exception as e:
+                self.state.failed[batch_dir] = signature
+                log.error("Failed to merge %s: %s", batch_dir, e)
+            else:
+                self.state.done[batch_dir] = signature
+                self.state.failed.pop(batch_dir, None)
+                log.info("Merged %s → %s", batch_dir, output)
+            self.state.crashes.pop(batch_dir, None)
+            if batch_dir in self.state.queue:
+                self.state.queue.remove(batch_dir)
+        if finished:
+            self.state.save()
+        return len(finished)
+
+    def run_once(self):
+        self.collect()
+        self.scan()
+        self.dispatch()
+
+    def drain(self):
+        """Merge everything queued, then return."""
+        while self.state.queue or self._in_flight:
+            self.dispatch()
+            self.collect(timeout=None)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """Watch until `stop` is set (or Ctrl+C). Filesystem events wake the loop early."""
+        stop = stop or threading.Event()
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            handler = _WakeHandler(self)
+            for root in self.folders:
+                observer.schedule(handler, root, recursive=True)
+            observer.start()
+        else:
+            log.info("watchdog not installed; polling every %.1fs", self.poll_interval)
+        try:
+            while not stop.is_set():
+                try:
+                    self.run_once()
+                except Exception:
+                    # e.g. a batch folder removed mid-scan: log it and keep watching the rest
+                    log.exception("Watch loop iteration failed; continuing")
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.close()
+
+    def close(self):
+        """Wait for running jobs, record them, and shut the pool down."""
+        while self._in_flight:
+            self.collect(timeout=None)
+        if self._owns_executor:
+            self._executor.shutdown()
+
+
+def load_config(path: str) -> dict:
+    """
+    Read watcher config JSON:
+    {"state_path": "...", "workers": 2, "poll_interval": 2.0, "full_rescan_interval": 600,
+     "folders": [{"path": "...", "output_dir": "...", "max_image_size": 1200, ...}]}
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    base = Path(path).resolve().parent
+    folders = []
+    for f in data.get("folders", []):
+        f = dict(f)
+        f["path"] = str(base / f["path"])
+        f["output_dir"] = str(base / f["output_dir"])
+        folders.append(WatchFolder(**f))
+    if not folders:
+        raise ValueError("Config has no folders to watch")
+    return {
+        "folders": folders,
+        "state_path": str(base / data.get("state_path", "watch_state.json")),
+        "workers": int(data.get("workers", os.cpu_count() or 2)),
+        "poll_interval": float(data.get("poll_interval", 2.0)),
+        "max_in_flight": int(data.get("max_in_flight", 0)),
+        "full_rescan_interval": float(data.get("full_rescan_interval", 600.0)),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Merge scan batches dropped into watched folders.")
+    parser.add_argument("config", help="watcher config JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    HotFolderWatcher(**load_config(args.config)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Shared fixtures."""
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def make_scans(tmp_path):
+    """Factory: write `count` PNGs scan0.png, scan1.png, ... growing by `step` from `size`; returns their paths."""
+
+    def make(count=5, size=(10, 10), step=(1, 0)):
+        paths = []
+        for i in range(count):
+            path = tmp_path / f"scan{i}.png"
+            w, h = size[0] + i * step[0], size[1] + i * step[1]
+            Image.new("RGB", (w, h), color=(i * 40 % 256, 100, 0)).save(path)
+            paths.append(str(path))
+        return paths
+
+    return make
+
+
+@pytest.fixture
+def scans(make_scans):
+    """Five small PNGs, 10x10 to 14x10, as paths."""
+    return make_scans()
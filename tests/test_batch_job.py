@@ -0,0 +1,69 @@
+"""Tests for resumable batch jobs."""
+import os
+
+import pytest
+from PIL import Image
+
+from src.batch_job import BatchJob
+from src.image_merger import load_images, merge_images
+
+
+def _job(scans, tmp_path, **options):
+    return BatchJob(scans, str(tmp_path / "out" / "merged.png"), str(tmp_path / "work"), **options)
+
+
+def test_output_matches_merge_images(scans, tmp_path):
+    job = _job(scans, tmp_path, spacing=3, max_image_size=12)
+    out = job.run()
+    expected = merge_images(load_images(scans), spacing=3, max_image_size=12)
+    with Image.open(out) as result:
+        assert result.convert("RGBA").tobytes() == expected.tobytes()
+    assert job.processed == 5
+
+
+def test_resume_after_crash(scans, tmp_path, monkeypatch):
+    calls = []
+    original = BatchJob._build
+
+    def crashing_build(self, path, st):
+        if len(calls) == 3:
+            raise KeyboardInterrupt  # killed halfway
+        calls.append(path)
+        original(self, path, st)
+
+    monkeypatch.setattr(BatchJob, "_build", crashing_build)
+    with pytest.raises(KeyboardInterrupt):
+        _job(scans, tmp_path).run()
+    assert not (tmp_path / "out" / "merged.png").exists()
+
+    monkeypatch.setattr(BatchJob, "_build", original)
+    job = _job(scans, tmp_path)
+    job.run()
+    assert (job.skipped, job.processed) == (3, 2)
+    assert (tmp_path / "out" / "merged.png").exists()
+
+
+def test_only_changed_inputs_redone(scans, tmp_path):
+    _job(scans, tmp_path).run()
+    Image.new("RGB", (30, 10)).save(scans[1])  # content changed
+    st = os.stat(scans[2])
+    os.utime(scans[2], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # only touched
+    job = _job(scans, tmp_path)
+    out = job.run()
+    assert (job.skipped, job.processed) == (4, 1)
+    with Image.open(out) as result:
+        assert result.width == 10 + 30 + 12
+
+    job = _job(scans, tmp_path)
+    job.run()
+    assert job.processed == 0
+
+
+def test_block_option_change_invalidates(scans, tmp_path):
+    _job(scans, tmp_path).run()
+    job = _job(scans, tmp_path, label_height=32)
+    job.run()
+    assert job.processed == 5
+    job = _job(scans, tmp_path, label_height=32, spacing=4)  # layout-only change reuses blocks
+    job.run()
+    assert job.processed == 0
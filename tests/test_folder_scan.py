@@ -0,0 +1,43 @@
+"""Tests for recursive folder scanning."""
+from src.folder_scan import iter_supported_files, natural_sort_key
+
+
+def test_natural_sort_key():
+    names = ["scan10.png", "Scan2.png", "scan1.png", "a.png"]
+    assert sorted(names, key=natural_sort_key) == ["a.png", "scan1.png", "Scan2.png", "scan10.png"]
+
+
+def test_iter_supported_files_recursive(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "deep").mkdir(parents=True)
+    (tmp_path / ".hidden").mkdir()
+    for rel in ("p10.png", "p2.jpg", "notes.txt", "a/x.pdf", "a/deep/y.tif", "b/z.gif", ".hidden/h.png"):
+        (tmp_path / rel).write_bytes(b"")
+    found = [p[len(str(tmp_path)) + 1:].replace("\\", "/") for p in iter_supported_files(str(tmp_path))]
+    assert found == ["p2.jpg", "p10.png", "a/x.pdf", "a/deep/y.tif", "b/z.gif"]
+
+
+def test_iter_supported_files_extension_filter(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"")
+    (tmp_path / "b.pdf").write_bytes(b"")
+    assert [p.endswith("b.pdf") for p in iter_supported_files(str(tmp_path), {".PDF"})] == [True]
+
+
+def test_iter_supported_files_missing_root(tmp_path):
+    assert list(iter_supported_files(str(tmp_path / "missing"))) == []
+
+
+def test_iter_supported_files_cancel_stops_walk(tmp_path):
+    for i in range(5):
+        sub = tmp_path / f"d{i}"
+        sub.mkdir()
+        for j in range(20):
+            (sub / f"notes{j}.txt").write_bytes(b"")  # nothing to yield: only the cancel check can stop it
+    checks = []
+
+    def cancelled():
+        checks.append(1)
+        return len(checks) > 3
+
+    assert list(iter_supported_files(str(tmp_path), cancelled=cancelled)) == []
+    assert len(checks) == 4  # stopped at the first check that said yes, not after the whole tree
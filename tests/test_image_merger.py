@@ -7,8 +7,13 @@ from PIL import Image
 
 from src.image_merger import (
     MergeDirection,
+    ResampleQuality,
+    _resize_to_max,
+    iter_frame_refs,
+    iter_images,
     load_images,
     merge_images,
+    parse_frame_range,
 )
 
 
@@ -75,6 +80,20 @@ def test_merge_images_with_spacing(temp_image_10x10):
     assert result.height == 64 + 10
 
 
+@pytest.mark.parametrize("quality", list(ResampleQuality))
+def test_resize_to_max_tiers_same_size(quality):
+    img = Image.new("RGBA", (1000, 300), (10, 200, 30, 255))
+    out = _resize_to_max(img, 120, quality)
+    assert out.size == (120, 36)
+    assert out.getpixel((60, 18)) == (10, 200, 30, 255)
+
+
+def test_merge_images_resample_option(temp_image_20x20):
+    labeled = load_images([temp_image_20x20])
+    result = merge_images(labeled, max_image_size=5, resample=ResampleQuality.FAST)
+    assert result.size == (5, 64 + 5)
+
+
 def test_merge_images_empty_raises():
     with pytest.raises(ValueError, match="No images to merge"):
         merge_images([])
@@ -110,3 +129,87 @@ def test_load_images_mixed(temp_image_10x10, temp_pdf_one_page):
     labeled = load_images([temp_image_10x10, temp_pdf_one_page])
     assert len(labeled) == 2
     assert labeled[0][1].size == (10, 10)
+
+
+def test_import_is_light():
+    """Importing the core must not pull in Qt or PyMuPDF (startup time)."""
+    import subprocess
+    import sys
+
+    code = "import sys, src.image_merger; print(sorted({'fitz', 'pymupdf', 'PyQt5'} & set(sys.modules)))"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+@pytest.fixture
+def temp_tiff_3_pages(tmp_path):
+    """3-page TIFF with pages 10, 20 and 30 px wide."""
+    pages = [Image.new("RGB", (10 * (i + 1), 10), color=(i * 80, 0, 0)) for i in range(3)]
+    path = tmp_path / "fax.tif"
+    pages[0].save(path, save_all=True, append_images=pages[1:])
+    return str(path)
+
+
+def test_load_images_multipage_tiff(temp_tiff_3_pages):
+    labeled = load_images([temp_tiff_3_pages])
+    assert [label for label, _ in labeled] == ["fax (1)", "fax (2)", "fax (3)"]
+    assert [img.width for _, img in labeled] == [10, 20, 30]
+
+
+def test_load_images_animated_gif(tmp_path):
+    frames = [Image.new("RGB", (8, 8), color=(0, i * 100, 0)) for i in range(2)]
+    path = tmp_path / "anim.gif"
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100)
+    labeled = load_images([str(path)])
+    assert [label for label, _ in labeled] == ["anim (1)", "anim (2)"]
+
+
+def test_frame_range(temp_tiff_3_pages, temp_image_10x10):
+    labeled = load_images([temp_tiff_3_pages, temp_image_10x10], frame_range=(2, None))
+    assert [img.width for _, img in labeled] == [20, 30, 10]  # single-frame files are unaffected
+    assert [label for label, _ in load_images([temp_tiff_3_pages], (3, 3))] == ["fax (3)"]
+
+
+def test_frame_range_keeps_single_page_pdf(temp_pdf_one_page, temp_image_10x10):
+    labeled = load_images([temp_pdf_one_page, temp_image_10x10], frame_range=(2, None))
+    assert [label for label, _ in labeled] == [Path(temp_pdf_one_page).stem, Path(temp_image_10x10).stem]
+
+
+def test_iter_images_is_lazy(temp_tiff_3_pages):
+    frames = iter_images([temp_tiff_3_pages])
+    label, img = next(frames)
+    assert (label, img.width) == ("fax (1)", 10)
+    result = merge_images(iter_images([temp_tiff_3_pages]), cols_per_row=3)
+    assert result.size == (10 + 20 + 30, 64 + 10)
+
+
+def test_iter_frame_refs_matches_iter_images(monkeypatch, tmp_path, temp_tiff_3_pages, temp_pdf_one_page):
+    gif = tmp_path / "anim.gif"
+    frames = [Image.new("RGB", (8, 6), color=(0, i * 100, 0)) for i in range(3)]
+    frames[0].save(gif, save_all=True, append_images=frames[1:], duration=100)
+    paths = [temp_tiff_3_pages, str(gif), temp_pdf_one_page]
+    expected = [(label, img.size, img.tobytes()) for label, img in iter_images(paths, (2, None))]
+
+    from PIL import ImageFile
+
+    def no_decode(self):
+        raise AssertionError("pixels decoded while reading sizes")
+
+    with monkeypatch.context() as m:
+        m.setattr(ImageFile.ImageFile, "load", no_decode)
+        refs = list(iter_frame_refs(paths, (2, None)))
+    assert [(r.label, r.size) for r in refs] == [(label, size) for label, size, _ in expected]
+    assert [r.load().tobytes() for r in refs] == [data for _, _, data in expected]
+
+
+def test_parse_frame_range():
+    assert parse_frame_range("") is None
+    assert parse_frame_range("3") == (3, 3)
+    assert parse_frame_range("2-5") == (2, 5)
+    assert parse_frame_range("4-") == (4, None)
+    with pytest.raises(ValueError):
+        parse_frame_range("5-2")
+    with pytest.raises(ValueError):
+        parse_frame_range("a")
@@ -0,0 +1,80 @@
+"""Tests for the pipelined merge engine."""
+import time
+
+import pytest
+from PIL import Image
+
+import src.pipeline as pipeline_mod
+from src.image_merger import iter_images, merge_images
+from src.pipeline import merge_pipelined
+
+
+@pytest.fixture
+def inputs(make_scans, tmp_path):
+    paths = make_scans(7, size=(20, 15), step=(7, 3))
+    tiff = tmp_path / "fax.tif"
+    pages = [Image.new("RGB", (30, 10 * (i + 1))) for i in range(3)]
+    pages[0].save(tiff, save_all=True, append_images=pages[1:])
+    paths.insert(2, str(tiff))
+    paths.append(str(tmp_path / "missing.png"))
+    return paths
+
+
+@pytest.mark.parametrize("workers", [(1, 1, 1), (3, 2, 2)])
+def test_matches_merge_images(inputs, workers):
+    decode, resize, label = workers
+    options = {"spacing": 4, "cols_per_row": 3, "max_image_size": 30}
+    result = merge_pipelined(
+        inputs, decode_workers=decode, resize_workers=resize, label_workers=label, queue_size=2, **options
+    )
+    expected = merge_images(iter_images(inputs), **options)
+    assert result.image.size == expected.size
+    assert result.image.tobytes() == expected.tobytes()
+
+
+def test_stats_per_stage(inputs):
+    result = merge_pipelined(inputs)
+    by_name = {s.name: s for s in result.stats}
+    assert list(by_name) == ["decode", "resize", "label", "composite"]
+    assert all(by_name[name].items == 10 for name in by_name)  # 7 PNGs + 3 TIFF pages
+    assert result.bottleneck in result.stats
+    assert "bottleneck" in result.report()
+
+
+def test_single_and_empty(inputs):
+    single = merge_pipelined(inputs[:1]).image
+    assert single.tobytes() == merge_images(iter_images(inputs[:1])).tobytes()
+    with pytest.raises(ValueError, match="No images to merge"):
+        merge_pipelined(["/nonexistent.png"])
+
+
+def test_worker_error_propagates(inputs, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(pipeline_mod, "_make_labeled_block", broken)
+    with pytest.raises(RuntimeError, match="boom"):
+        merge_pipelined(inputs, queue_size=1)
+
+
+def test_reorder_buffer_is_bounded(make_scans, monkeypatch):
+    paths = make_scans(100, size=(4, 4), step=(0, 0))
+    real_iter_images = pipeline_mod.iter_images
+
+    def slow_first(frame_paths, frame_range=None):
+        if frame_paths[0] == paths[0]:
+            time.sleep(0.5)  # the other decode worker could run through every later input meanwhile
+        return real_iter_images(frame_paths, frame_range)
+
+    peak = [0]
+    real_add = pipeline_mod._RowCompositor.add
+
+    def tracking_add(self, message):
+        real_add(self, message)
+        peak[0] = max(peak[0], len(self.pending))
+
+    monkeypatch.setattr(pipeline_mod, "iter_images", slow_first)
+    monkeypatch.setattr(pipeline_mod._RowCompositor, "add", tracking_add)
+    result = merge_pipelined(paths, decode_workers=2, queue_size=2)
+    assert result.image.tobytes() == merge_images(iter_images(paths)).tobytes()
+    assert peak[0] <= 2
@@ -0,0 +1,183 @@
+"""Tests for the local HTTP merge service (against a server on localhost)."""
+import io
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import src.server as server_mod
+from src.server import MergeHTTPServer, MergeService
+
+
+def _start(service, **server_options):
+    httpd = MergeHTTPServer(("127.0.0.1", 0), service, quiet=True, **server_options)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+@pytest.fixture
+def base_url():
+    httpd, url = _start(MergeService(workers=2, max_queue=2, executor=ThreadPoolExecutor(max_workers=2)))
+    yield url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _png_bytes(size):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color=(0, 0, 255)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _post(url, data, content_type):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": content_type}, method="POST")
+    return urllib.request.urlopen(req, timeout=30)
+
+
+def _multipart(files, fields):
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for name, value in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for filename, data in files:
+        out.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+            "Content-Type: image/png\r\n\r\n".encode()
+        )
+        out.write(data + b"\r\n")
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def test_merge_multipart_upload(base_url):
+    body, ctype = _multipart([("a.png", _png_bytes((10, 10))), ("b.png", _png_bytes((20, 20)))], {"spacing": "5"})
+    with _post(base_url + "/merge", body, ctype) as resp:
+        assert resp.headers["Content-Type"] == "image/png"
+        img = Image.open(io.BytesIO(resp.read()))
+    assert img.size == (10 + 5 + 20, 64 + 20)
+
+
+def test_merge_local_paths_jpeg(base_url, tmp_path):
+    path = tmp_path / "scan.png"
+    Image.new("RGB", (30, 10)).save(path)
+    body = json.dumps({"paths": [str(path)], "format": "jpg"}).encode()
+    with _post(base_url + "/merge", body, "application/json") as resp:
+        assert resp.headers["Content-Type"] == "image/jpeg"
+        assert Image.open(io.BytesIO(resp.read())).size == (30, 64 + 10)
+
+
+def test_multipart_streamed_in_chunks(base_url, monkeypatch):
+    # Parts span many reads and a delimiter can straddle two reads; fields/paths keep working
+    monkeypatch.setattr(server_mod, "CHUNK_SIZE", 7)
+    body, ctype = _multipart([("a.png", _png_bytes((30, 10))), ("b.png", _png_bytes((20, 20)))], {"spacing": "2"})
+    with _post(base_url + "/merge", body, ctype) as resp:
+        assert Image.open(io.BytesIO(resp.read())).size == (30 + 2 + 20, 64 + 20)
+
+
+def test_multipart_upload_not_held_in_memory(tmp_path):
+    import tracemalloc
+
+    data = _png_bytes((10, 10)) + b"\0" * (8 * 1024 * 1024)  # PNG readers ignore trailing bytes
+    body, ctype = _multipart([("big.png", data)], {})
+    tracemalloc.start()
+    try:
+        paths, _ = server_mod._parse_multipart(ctype, io.BytesIO(body), len(body), tmp_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (tmp_path / "0" / "big.png").read_bytes() == data
+    assert peak < 1024 * 1024
+
+
+def test_bad_request(base_url):
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(base_url + "/merge", json.dumps({"paths": ["/nonexistent.png"]}).encode(), "application/json")
+    assert exc.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(base_url + "/merge", json.dumps({"paths": ["x"], "spacing": "a"}).encode(), "application/json")
+    assert exc.value.code == 400
+
+
+def _raw_post(url, content_length):
+    """POST /merge with the given Content-Length header and no body; returns the status line."""
+    host, port = url.rsplit("/", 1)[-1].split(":")
+    with socket.create_connection((host, int(port)), timeout=10) as sock:
+        sock.sendall(
+            f"POST /merge HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {content_length}\r\n\r\n".encode()
+        )
+        return sock.makefile("rb").readline().decode()
+
+
+def test_stalled_body_times_out_and_frees_slot():
+    httpd, url = _start(
+        MergeService(workers=1, max_queue=0, executor=ThreadPoolExecutor(max_workers=1)), request_timeout=0.5
+    )
+    try:
+        host, port = url.rsplit("/", 1)[-1].split(":")
+        with socket.create_connection((host, int(port)), timeout=10) as sock:
+            sock.sendall(
+                b"POST /merge HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                b"Content-Length: 100\r\n\r\n{"  # ...and nothing more
+            )
+            assert " 408 " in sock.makefile("rb").readline().decode()
+        # The only slot is free again: a normal request is served, not rejected with 429
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _post(url + "/merge", json.dumps({"paths": ["/nonexistent.png"]}).encode(), "application/json")
+        assert exc.value.code == 400
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_invalid_content_length(base_url):
+    assert " 400 " in _raw_post(base_url, "abc")
+    assert " 400 " in _raw_post(base_url, "-1")
+
+
+def test_overload_returns_429_and_metrics(monkeypatch, tmp_path):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_job(paths, output_path, options):
+        started.set()
+        release.wait(10)
+        Image.new("RGB", (1, 1)).save(output_path)
+        return 0.0
+
+    monkeypatch.setattr(server_mod, "render_job", blocking_job)
+    httpd, url = _start(MergeService(workers=1, max_queue=0, executor=ThreadPoolExecutor(max_workers=1)))
+    try:
+        body = json.dumps({"paths": ["x.png"]}).encode()
+        first = threading.Thread(target=lambda: _post(url + "/merge", body, "application/json").read())
+        first.start()
+        assert started.wait(10)
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _post(url + "/merge", body, "application/json")
+        assert exc.value.code == 429
+        # Rejected before the body is read: no need to wait for a (never sent) upload
+        assert " 429 " in _raw_post(url, 10 * 1024 * 1024)
+        metrics = urllib.request.urlopen(url + "/metrics", timeout=10).read().decode()
+        assert "merge_jobs_in_flight 1" in metrics
+        assert "merge_rejected_total 2" in metrics
+        release.set()
+        first.join(10)
+        for _ in range(50):  # the handler records the response just after the body is sent
+            metrics = urllib.request.urlopen(url + "/metrics", timeout=10).read().decode()
+            if 'merge_responses_total{code="200"} 1' in metrics:
+                break
+            time.sleep(0.05)
+        assert 'merge_responses_total{code="200"} 1' in metrics
+        assert "merge_latency_seconds_count 1" in metrics
+    finally:
+        release.set()
+        httpd.shutdown()
+        httpd.server_close()
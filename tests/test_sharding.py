@@ -0,0 +1,90 @@
+"""Tests for multi-page (sharded) output."""
+import pytest
+from PIL import Image
+
+from src.image_merger import FrameRef, load_images, merge_images
+from src.sharding import merge_pages, merge_pages_from_files, plan_pages
+
+
+def _items(n, size=(10, 10)):
+    return [(f"img{i}", Image.new("RGBA", size, (i * 20, 0, 0, 255))) for i in range(n)]
+
+
+def test_plan_pages_by_rows():
+    pages = plan_pages([(10, 74)] * 7, cols_per_row=3, max_rows_per_page=2)
+    assert pages == [[[0, 1, 2], [3, 4, 5]], [[6]]]
+
+
+def test_plan_pages_by_height_and_width():
+    sizes = [(10, 74)] * 6
+    # 74 + 5 + 74 = 153 > 150 → one row per page
+    assert len(plan_pages(sizes, cols_per_row=3, spacing=5, max_page_height=150)) == 2
+    # width 25 fits two blocks (10 + 5 + 10) per row
+    assert plan_pages(sizes, cols_per_row=3, spacing=5, max_page_width=25)[0][0] == [0, 1]
+
+
+def test_plan_pages_oversized_block_gets_own_page():
+    pages = plan_pages([(10, 500), (10, 74)], cols_per_row=1, max_page_height=100)
+    assert pages == [[[0]], [[1]]]
+
+
+def test_merge_pages_numbered_png(tmp_path):
+    items = _items(7)
+    out = tmp_path / "merged.png"
+    paths = merge_pages(items, str(out), max_rows_per_page=2, workers=2)
+    assert [p.rsplit("/", 1)[-1].rsplit("\\", 1)[-1] for p in paths] == ["merged_001.png", "merged_002.png"]
+    first = Image.open(paths[0])
+    assert first.size == (30, 2 * 74)
+    # Page 1 matches merge_images on the same six items
+    expected = merge_images(items[:6])
+    assert first.convert("RGBA").tobytes() == expected.tobytes()
+
+
+def test_merge_pages_single_page_keeps_name(tmp_path):
+    out = tmp_path / "merged.jpg"
+    assert merge_pages(_items(2), str(out)) == [str(out)]
+    assert out.exists()
+
+
+def test_merge_pages_removes_stale_pages(tmp_path):
+    out = tmp_path / "merged.png"
+    (tmp_path / "other_001.png").write_bytes(b"")
+    merge_pages(_items(7), str(out), max_rows_per_page=1)
+    assert sorted(p.name for p in tmp_path.glob("merged*")) == ["merged_001.png", "merged_002.png", "merged_003.png"]
+    merge_pages(_items(4), str(out), max_rows_per_page=1)  # re-merged into fewer pages
+    assert sorted(p.name for p in tmp_path.glob("merged*")) == ["merged_001.png", "merged_002.png"]
+    merge_pages(_items(2), str(out))
+    assert sorted(p.name for p in tmp_path.glob("merged*")) == ["merged.png"]
+    assert (tmp_path / "other_001.png").exists()
+
+
+def test_merge_pages_multipage_tiff(tmp_path):
+    tif = tmp_path / "merged.tif"
+    merge_pages(_items(5), str(tif), cols_per_row=1, max_rows_per_page=2, workers=2)
+    with Image.open(tif) as img:
+        assert img.n_frames == 3
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_merge_pages_multipage_pdf(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    pdf = tmp_path / "merged.pdf"
+    merge_pages(_items(5), str(pdf), cols_per_row=1, max_rows_per_page=2, workers=2)
+    doc = fitz.open(str(pdf))
+    assert len(doc) == 3
+    doc.close()
+
+
+def test_merge_pages_from_files_decodes_per_page(monkeypatch, tmp_path, scans):
+    loads = []
+    original_load = FrameRef.load
+    monkeypatch.setattr(FrameRef, "load", lambda ref: loads.append(ref.label) or original_load(ref))
+
+    out = tmp_path / "out" / "merged.png"
+    out.parent.mkdir()
+    written = merge_pages_from_files(scans, str(out), cols_per_row=2, max_rows_per_page=1, workers=1)
+    assert len(written) == 3
+    assert sorted(loads) == [f"scan{i}" for i in range(5)]  # each input decoded once, by its page job
+    expected = merge_pages(load_images(scans), str(tmp_path / "ref.png"), cols_per_row=2, max_rows_per_page=1)
+    for got, want in zip(written, expected):
+        assert Image.open(got).tobytes() == Image.open(want).tobytes()
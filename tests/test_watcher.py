@@ -0,0 +1,259 @@
+"""Tests for the hot-folder watcher."""
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+import src.watcher as watcher_mod
+from src.watcher import HotFolderWatcher, WatchFolder, load_config
+
+
+@pytest.fixture
+def hot_folder(tmp_path):
+    inbox = tmp_path / "inbox"
+    out = tmp_path / "out"
+    inbox.mkdir()
+    return inbox, out, tmp_path / "state.json"
+
+
+def _make_batch(inbox, name, count=2):
+    batch = inbox / name
+    batch.mkdir()
+    for i in range(count):
+        Image.new("RGB", (10, 10), color=(i * 50, 0, 0)).save(batch / f"scan{i}.png")
+    return batch
+
+
+def _watcher(folder, state_path):
+    return HotFolderWatcher([folder], str(state_path), executor=ThreadPoolExecutor(max_workers=2))
+
+
+def test_batch_merged_after_settling(hot_folder):
+    inbox, out, state = hot_folder
+    _make_batch(inbox, "batch1")
+    w = _watcher(WatchFolder(str(inbox), str(out), settle_seconds=0), state)
+    assert w.scan() == 0  # first sighting only starts the quiescence timer
+    assert w.scan() == 1
+    w.drain()
+    result = Image.open(out / "batch1.png")
+    assert result.size == (10 + 10, 64 + 10)
+    assert not list(out.glob("*.tmp"))
+
+
+def test_marker_file_required(hot_folder):
+    inbox, out, state = hot_folder
+    batch = _make_batch(inbox, "batch1")
+    w = _watcher(WatchFolder(str(inbox), str(out), marker_name=".done"), state)
+    assert w.scan() == 0
+    (batch / ".done").touch()
+    assert w.scan() == 1
+
+
+def test_restart_skips_finished_and_resumes_queue(hot_folder):
+    inbox, out, state = hot_folder
+    _make_batch(inbox, "a")
+    folder = WatchFolder(str(inbox), str(out), settle_seconds=0)
+    w = _watcher(folder, state)
+    w.scan()
+    w.scan()
+    w.drain()
+    _make_batch(inbox, "b")
+    w.scan()
+    w.scan()
+    # "b" is queued but the process dies before merging it
+    saved = json.loads(state.read_text())
+    assert len(saved["queue"]) == 1 and saved["queue"][0].endswith("b")
+
+    w2 = _watcher(folder, state)
+    w2.scan()
+    w2.scan()
+    assert len(w2.state.queue) == 1  # "a" is not queued again
+    w2.drain()
+    assert (out / "b.png").exists()
+    assert w2.state.queue == []
+
+
+def test_changed_batch_is_merged_again(hot_folder):
+    inbox, out, state = hot_folder
+    batch = _make_batch(inbox, "a", count=1)
+    w = _watcher(WatchFolder(str(inbox), str(out), settle_seconds=0), state)
+    w.scan()
+    w.scan()
+    w.drain()
+    Image.new("RGB", (10, 10)).save(batch / "scan9.png")
+    w.scan()
+    assert w.scan() == 1
+    w.drain()
+    assert Image.open(out / "a.png").width == 20
+
+
+def test_failed_batch_retried_after_in_place_fix(hot_folder):
+    inbox, out, state = hot_folder
+    batch = inbox / "a"
+    batch.mkdir()
+    (batch / "scan0.png").write_bytes(b"not an image")
+    w = _watcher(WatchFolder(str(inbox), str(out), settle_seconds=0), state)
+    w.scan()
+    w.scan()
+    w.drain()
+    assert list(w.state.failed) == [str(batch)]
+    assert w.scan() == 0
+    # Overwriting the file keeps the folder's mtime; the watchdog event must still get it re-checked
+    Image.new("RGB", (10, 10)).save(batch / "scan0.png")
+    w.note_change(str(batch / "scan0.png"))
+    w.scan()
+    assert w.scan() == 1
+    w.drain()
+    assert (out / "a.png").exists() and not w.state.failed
+
+
+def test_broken_pool_is_replaced(hot_folder):
+    inbox, out, state = hot_folder
+    w = HotFolderWatcher([WatchFolder(str(inbox), str(out), settle_seconds=0)], str(state), workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            w._executor.submit(os._exit, 1).result()  # a worker dies, as on an OOM kill
+        _make_batch(inbox, "a")
+        w.scan()
+        w.scan()
+        w.drain()
+        assert (out / "a.png").exists()
+    finally:
+        w.close()
+
+
+_merge_batch = watcher_mod.merge_batch
+
+
+def _slow_merge_batch(paths, output_path, options):
+    time.sleep(1.0)
+    return _merge_batch(paths, output_path, options)
+
+
+def test_batches_in_flight_requeued_when_worker_dies(hot_folder, monkeypatch):
+    inbox, out, state = hot_folder
+    _make_batch(inbox, "a")
+    _make_batch(inbox, "b")
+    monkeypatch.setattr(watcher_mod, "merge_batch", _slow_merge_batch)
+    w = HotFolderWatcher([WatchFolder(str(inbox), str(out), settle_seconds=0)], str(state), workers=3)
+    try:
+        w.scan()
+        w.scan()
+        assert w.dispatch() == 2
+        time.sleep(0.3)
+        os.kill(next(iter(w._executor._processes)), signal.SIGKILL)  # one worker dies mid-merge
+        while w._in_flight:
+            w.collect(timeout=None)
+        assert w.state.failed == {}
+        assert sorted(os.path.basename(b) for b in w.state.queue) == ["a", "b"]
+        assert all(n == 1 for n in w.state.crashes.values())
+        w.drain()
+        assert (out / "a.png").exists() and (out / "b.png").exists()
+        assert w.state.crashes == {} and w.state.failed == {}
+        assert w.scan() == 0
+    finally:
+        w.close()
+
+
+def test_file_removed_mid_scan(hot_folder, monkeypatch):
+    inbox, out, state = hot_folder
+    batch = _make_batch(inbox, "a", count=3)
+    real_scandir = os.scandir
+
+    class _RemovedAfterListing:
+        """scandir() that lists scan1.png, which is then moved away before it is stat()ed."""
+
+        def __init__(self, path):
+            with real_scandir(path) as it:
+                self._entries = list(it)
+            if os.fspath(path) == str(batch):
+                (batch / "scan1.png").unlink(missing_ok=True)
+
+        def __enter__(self):
+            return iter(self._entries)
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(watcher_mod.os, "scandir", _RemovedAfterListing)
+    w = _watcher(WatchFolder(str(inbox), str(out), settle_seconds=0), state)
+    w.scan()
+    assert w.scan() == 1
+    w.drain()
+    assert Image.open(out / "a.png").width == 20  # the two files that are still there
+
+
+def test_run_survives_failed_iteration(hot_folder, monkeypatch):
+    inbox, out, state = hot_folder
+    w = _watcher(WatchFolder(str(inbox), str(out)), state)
+    w.poll_interval = 0.01
+    stop = threading.Event()
+    calls = []
+
+    def flaky_scan():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("batch folder vanished")
+        stop.set()
+        return 0
+
+    monkeypatch.setattr(watcher_mod, "Observer", None)
+    monkeypatch.setattr(w, "scan", flaky_scan)
+    w.run(stop)
+    assert len(calls) == 2
+
+
+def test_finished_batches_not_rehashed_every_poll(hot_folder, monkeypatch):
+    inbox, out, state = hot_folder
+    batch = _make_batch(inbox, "a")
+    w = _watcher(WatchFolder(str(inbox), str(out), settle_seconds=0), state)
+    w.scan()
+    w.scan()
+    w.drain()
+    w.scan()  # hashes once more and remembers the batch as finished
+    hashed = []
+    real_signature = watcher_mod._signature
+    monkeypatch.setattr(watcher_mod, "_signature", lambda files: hashed.append(1) or real_signature(files))
+    for _ in range(3):
+        assert w.scan() == 0
+    assert hashed == []
+    Image.new("RGB", (10, 10)).save(batch / "scan0.png")  # in place: folder mtime unchanged
+    w.full_rescan_interval = 0  # the periodic full rescan catches it even without watchdog
+    w.scan()
+    assert w.scan() == 1
+
+
+def test_output_dir_inside_watched_folder_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        WatchFolder(str(tmp_path), str(tmp_path / "merged"))
+    with pytest.raises(ValueError):
+        WatchFolder(str(tmp_path), str(tmp_path))
+    WatchFolder(str(tmp_path / "in"), str(tmp_path / "out"))
+
+
+def test_load_config_resolves_relative_paths(tmp_path):
+    cfg = tmp_path / "watch.json"
+    cfg.write_text(json.dumps({"folders": [{"path": "in", "output_dir": "out", "max_image_size": 800}]}))
+    config = load_config(str(cfg))
+    folder = config["folders"][0]
+    assert folder.path == str(tmp_path / "in")
+    assert folder.merge_options()["max_image_size"] == 800
+    assert config["state_path"] == str(tmp_path / "watch_state.json")
+
+
+def test_paged_output(hot_folder):
+    inbox, out, state = hot_folder
+    _make_batch(inbox, "batch1", count=4)
+    folder = WatchFolder(str(inbox), str(out), output_format="tif", cols_per_row=1, max_rows_per_page=3, settle_seconds=0)
+    w = _watcher(folder, state)
+    w.scan()
+    w.scan()
+    w.drain()
+    with Image.open(out / "batch1.tif") as img:
+        assert img.n_frames == 2